@@ -1,6 +1,7 @@
 import pandas as pd
 import zipfile
 from collections import Counter
+import stage_cache
 
 # ================= 配置区 =================
 TARGET_ID = '4901362'
@@ -9,6 +10,8 @@ INPUT_CSV = 'citation_analysis_4901362_final.csv'
 TOP_N_GIANTS = 20  # 选取前20个最强的施引专利进行“发散扩散”分析
 OUTPUT_EDGES = 'expanded_diffusion_edges.csv'
 OUTPUT_NODES = 'expanded_diffusion_nodes.csv'
+CHUNK_SIZE = 2000000
+GIANT_MODE = 'exact'  # 'approx' 时用 heavy_hitters 的有界内存流式 Top-N（多进程 + 候选精确复核）
 # ==========================================
 
 def build_advanced_diffusion_network():
@@ -23,17 +26,26 @@ def build_advanced_diffusion_network():
     print(f">>> 正在识别前 {TOP_N_GIANTS} 个‘巨人施引者’作为发散源...")
     
     # 3. 第一次扫描：获取权重并确定发散源
-    global_counts = Counter()
-    with zipfile.ZipFile(FILE_CITATION) as z:
-        with z.open(z.namelist()[0]) as f:
-            reader = pd.read_csv(f, sep='\t', chunksize=2000000, low_memory=False, usecols=['citation_patent_id'])
-            for chunk in reader:
-                chunk['citation_patent_id'] = chunk['citation_patent_id'].astype(str)
-                mask = chunk['citation_patent_id'].isin(citing_ids)
-                global_counts.update(chunk.loc[mask, 'citation_patent_id'].tolist())
-    
-    # 选出发散源 ID
-    giants = [p for p, c in global_counts.most_common(TOP_N_GIANTS)]
+    if GIANT_MODE == 'approx':
+        import heavy_hitters
+        top, summary = heavy_hitters.top_k_cited(FILE_CITATION, TOP_N_GIANTS, domain=citing_ids,
+                                                 capacity=heavy_hitters.CAPACITY, chunksize=CHUNK_SIZE)
+        giants = top['patent_id'].tolist()
+        # 发散源为精确计数；其余施引者的权重取摘要估计值（上界）
+        global_counts = Counter(summary.counts.to_dict())
+        for p, c in zip(top['patent_id'], top['citations']):
+            global_counts[p] = int(c)
+    else:
+        global_counts = Counter()
+        with zipfile.ZipFile(FILE_CITATION) as z:
+            with z.open(z.namelist()[0]) as f:
+                reader = pd.read_csv(f, sep='\t', chunksize=CHUNK_SIZE, low_memory=False, usecols=['citation_patent_id'])
+                for chunk in reader:
+                    chunk['citation_patent_id'] = chunk['citation_patent_id'].astype(str)
+                    mask = chunk['citation_patent_id'].isin(citing_ids)
+                    global_counts.update(chunk.loc[mask, 'citation_patent_id'].tolist())
+        # 选出发散源 ID
+        giants = [p for p, c in global_counts.most_common(TOP_N_GIANTS)]
     all_monitored_ids = citing_ids | {TARGET_ID}
     
     print(f">>> 确定的发散源包括: {giants[:5]}等")
@@ -47,7 +59,7 @@ def build_advanced_diffusion_network():
     print(">>> 正在提取跨层连边（这可能需要较长时间）...")
     with zipfile.ZipFile(FILE_CITATION) as z:
         with z.open(z.namelist()[0]) as f:
-            reader = pd.read_csv(f, sep='\t', chunksize=2000000, low_memory=False, 
+            reader = pd.read_csv(f, sep='\t', chunksize=CHUNK_SIZE, low_memory=False, 
                                  usecols=['patent_id', 'citation_patent_id'])
             for chunk in reader:
                 chunk['patent_id'] = chunk['patent_id'].astype(str)
@@ -91,5 +103,16 @@ def build_advanced_diffusion_network():
     print(f"边表: {OUTPUT_EDGES} (含内部重组及外部扩散)")
     print(f"点表: {OUTPUT_NODES} (已标记 Core/Awakener/Diffusion 层次)")
 
+def run():
+    inputs = [__file__, FILE_CITATION, INPUT_CSV]
+    config = {'target': TARGET_ID, 'top_n_giants': TOP_N_GIANTS, 'chunk': CHUNK_SIZE, 'giant_mode': GIANT_MODE}
+    if GIANT_MODE == 'approx':
+        # 近似模式的结果还取决于 heavy_hitters 的代码与摘要容量
+        import heavy_hitters
+        inputs.append(heavy_hitters.__file__)
+        config['capacity'] = heavy_hitters.CAPACITY
+    return stage_cache.run_stage('expand', build_advanced_diffusion_network,
+                                 inputs=inputs, outputs=[OUTPUT_EDGES, OUTPUT_NODES], config=config)
+
 if __name__ == "__main__":
-    build_advanced_diffusion_network()
\ No newline at end of file
+    run()
\ No newline at end of file
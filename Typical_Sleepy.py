@@ -1,5 +1,22 @@
 import pandas as pd
 import numpy as np
+import os
+import stage_cache
+
+# ================= 配置区 =================
+INPUT_FILE = 'ai_patent_summary.csv'
+OUTPUT_FILE = 'kleinberg_star_beauties.csv'
+SIGNIFICANCE_FILE = 'sleeping_beauty_significance.csv'  # null_model.py 的输出，存在时附加 p 值列
+# ==========================================
+
+def parse_history(history_str):
+    """解析 "年份:次数; 年份:次数" 格式的引证历史"""
+    history = {}
+    for item in str(history_str).split('; '):
+        if ':' in item:
+            y, c = item.split(':')
+            history[int(y)] = int(c)
+    return history
 
 def detect_burst_year(history_str, birth_year):
     """
@@ -9,11 +26,7 @@ def detect_burst_year(history_str, birth_year):
     if pd.isna(history_str): return None
     
     # 1. 解析引证历史
-    history = {}
-    for item in str(history_str).split('; '):
-        if ':' in item:
-            y, c = item.split(':')
-            history[int(y)] = int(c)
+    history = parse_history(history_str)
     if not history: return None
     
     years = sorted(history.keys())
@@ -47,11 +60,7 @@ def detect_burst_year(history_str, birth_year):
 
 def calculate_b_coefficient(row):
     """计算 B 系数（偏移面积法）"""
-    history = {}
-    for item in str(row['citation_history']).split('; '):
-        if ':' in item:
-            y, c = item.split(':')
-            history[int(y)] = int(c)
+    history = parse_history(row['citation_history'])
     if not history: return 0
     
     birth_year = row['birth_year']
@@ -71,8 +80,8 @@ def calculate_b_coefficient(row):
     return b
 
 def main():
-    input_file = 'ai_patent_summary.csv' 
-    output_file = 'kleinberg_star_beauties.csv'
+    input_file = INPUT_FILE
+    output_file = OUTPUT_FILE
 
     print("正在加载数据并执行突发检测与 B 指数计算...")
     df = pd.read_csv(input_file)
@@ -108,11 +117,22 @@ def main():
     # 整理输出列
     output_cols = ['target_patent_id', 'birth_year', 'awakening_year', 'substantive_gap', 
                    'total_citations', 'B_index', 'research_label', 'citation_history']
+
+    # 6. 附加零模型显著性（若已运行 null_model.py）
+    if SIGNIFICANCE_FILE and os.path.exists(SIGNIFICANCE_FILE):
+        sig = pd.read_csv(SIGNIFICANCE_FILE, dtype={'target_patent_id': str})[['target_patent_id', 'p_B', 'p_gap']]
+        stars['target_patent_id'] = stars['target_patent_id'].astype(str)
+        stars = stars.merge(sig, on='target_patent_id', how='left')
+        output_cols += ['p_B', 'p_gap']
     stars[output_cols].to_csv(output_file, index=False)
     
     print("-" * 30)
     print(f"处理完成！识别出具有显著突发特征的睡美人 {len(stars)} 个。")
     print(f"结果已存至: {output_file}")
 
+def run():
+    return stage_cache.run_stage('detect', main, inputs=[__file__, INPUT_FILE, SIGNIFICANCE_FILE],
+                                 outputs=[OUTPUT_FILE])
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    run()
\ No newline at end of file
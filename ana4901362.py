@@ -1,13 +1,15 @@
 import pandas as pd
 import zipfile
+import patent_index
+import stage_cache
 
 # ================= 配置区 =================
 TARGET_PATENT = '4901362'
 FILE_CITATION = 'g_us_patent_citation.tsv.zip'  
 FILE_PATENT = 'g_patent.tsv.zip'                
-FILE_ASSIGNEE = 'g_assignee_disambiguated.tsv.zip' 
 FILE_CPC = 'g_cpc_current.tsv.zip'              
 OUTPUT_FILE = 'citation_analysis_4901362_final.csv'
+CHUNK_SIZE = 1000000
 # ==========================================
 
 def get_depth_data():
@@ -21,7 +23,7 @@ def get_depth_data():
             col_citing = 'patent_id'
             col_cited = 'citation_patent_id'
             
-            reader = pd.read_csv(f, sep='\t', chunksize=1000000, low_memory=False, 
+            reader = pd.read_csv(f, sep='\t', chunksize=CHUNK_SIZE, low_memory=False, 
                                  usecols=[col_citing, col_cited])
             for chunk in reader:
                 # 确保匹配时类型一致
@@ -47,30 +49,18 @@ def get_depth_data():
             date_col = 'patent_date' if 'patent_date' in header else 'date'
             
             f.seek(0)
-            reader = pd.read_csv(f, sep='\t', chunksize=1000000, low_memory=False, usecols=[pid_col, date_col])
+            reader = pd.read_csv(f, sep='\t', chunksize=CHUNK_SIZE, low_memory=False, usecols=[pid_col, date_col])
             for chunk in reader:
                 chunk[pid_col] = chunk[pid_col].astype(str)
                 mask = chunk[pid_col].isin(citing_ids)
                 for _, row in chunk[mask].iterrows():
                     results[row[pid_col]]['year'] = str(row[date_col])[:4]
 
-    # 3. 关联申请人
-    print("步骤 3: 正在关联消歧后的申请人名称...")
-    with zipfile.ZipFile(FILE_ASSIGNEE) as z:
-        with z.open(z.namelist()[0]) as f:
-            header = pd.read_csv(f, sep='\t', nrows=0).columns.tolist()
-            pid_col = 'patent_id' if 'patent_id' in header else 'id'
-            # 消歧后的组织名称列
-            org_col = 'organization' if 'organization' in header else 'disambig_assignee_organization'
-            
-            f.seek(0)
-            reader = pd.read_csv(f, sep='\t', chunksize=1000000, low_memory=False, usecols=[pid_col, org_col])
-            for chunk in reader:
-                chunk[pid_col] = chunk[pid_col].astype(str)
-                mask = chunk[pid_col].isin(citing_ids)
-                for _, row in chunk[mask].iterrows():
-                    if pd.notna(row[org_col]):
-                        results[row[pid_col]]['assignee'] = row[org_col]
+    # 3. 关联申请人（走 专利 -> 申请人 索引，保留全部共同申请人）
+    print("步骤 3: 正在通过申请人索引关联消歧后的申请人名称...")
+    assignees = patent_index.patent_assignees(citing_ids)
+    for pid, orgs in assignees.groupby('patent_id')['assignee']:
+        results[pid]['assignee'] = "; ".join(dict.fromkeys(orgs))
 
     # 4. 关联 CPC
     print("步骤 4: 正在关联 CPC 技术领域...")
@@ -81,7 +71,7 @@ def get_depth_data():
             cpc_col = 'cpc_group' if 'cpc_group' in header else 'group_id'
             
             f.seek(0)
-            reader = pd.read_csv(f, sep='\t', chunksize=1000000, low_memory=False, usecols=[pid_col, cpc_col])
+            reader = pd.read_csv(f, sep='\t', chunksize=CHUNK_SIZE, low_memory=False, usecols=[pid_col, cpc_col])
             for chunk in reader:
                 chunk[pid_col] = chunk[pid_col].astype(str)
                 mask = chunk[pid_col].isin(citing_ids)
@@ -102,5 +92,12 @@ def get_depth_data():
     pd.DataFrame(output_list).sort_values('Year').to_csv(OUTPUT_FILE, index=False, encoding='utf-8-sig')
     print(f"完成！请查看: {OUTPUT_FILE}")
 
+def run():
+    return stage_cache.run_stage('citers', get_depth_data,
+                                 inputs=[__file__, patent_index.__file__, FILE_CITATION, FILE_PATENT, FILE_CPC,
+                                         patent_index.FILE_ASSIGNEE],
+                                 outputs=[OUTPUT_FILE],
+                                 config={'target': TARGET_PATENT, 'chunk': CHUNK_SIZE})
+
 if __name__ == "__main__":
-    get_depth_data()
\ No newline at end of file
+    run()
\ No newline at end of file
@@ -0,0 +1,219 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import pandas as pd
+import patent_index as pi
+
+# ================= 配置区 =================
+FILE_CITATION = 'g_us_patent_citation.tsv.zip'
+DOMAIN_FILE = 'comprehensive_ai_patent_ids.csv'  # 只统计该清单内的被引专利；None 表示全库
+TOP_N = 100
+PER_YEAR = False          # True 时按施引专利授权年份分别取 Top-N
+CAPACITY = None           # Space-Saving 计数器个数，None 时取 max(20 * TOP_N, 10000)
+CHUNK_SIZE = 2000000
+WORKERS = None            # None 表示使用全部 CPU 核心
+OUTPUT_FILE = 'top_cited_patents.csv'
+# ==========================================
+
+
+class SpaceSaving:
+    """
+    可合并的 Space-Saving 摘要（Metwally 等；合并规则见 Cafaro 等）
+    counts 为估计值（真实值的上界），errors 为每个估计值的最大高估量；
+    未被记录的元素真实计数不超过 floor。合并后 floor 仍不超过 总量 / capacity。
+    """
+
+    def __init__(self, capacity, counts=None, errors=None, floor=0, total=0):
+        self.capacity = capacity
+        self.counts = counts if counts is not None else pd.Series(dtype=np.int64)
+        self.errors = errors if errors is not None else pd.Series(dtype=np.int64)
+        self.floor = int(floor)
+        self.total = int(total)
+
+    @classmethod
+    def from_values(cls, values, capacity):
+        """单个数据块的摘要：块内精确计数，只保留前 capacity 个"""
+        vc = pd.Series(values).value_counts()
+        floor = int(vc.iloc[capacity]) if len(vc) > capacity else 0
+        vc = vc.iloc[:capacity].astype(np.int64)
+        return cls(capacity, vc, pd.Series(0, index=vc.index, dtype=np.int64), floor, len(values))
+
+    def merge(self, other):
+        keys = self.counts.index.union(other.counts.index)
+        # 某一方未记录的元素，按该方的 floor 计入（保持上界性质）
+        counts = (self.counts.reindex(keys, fill_value=self.floor)
+                  + other.counts.reindex(keys, fill_value=other.floor))
+        errors = (self.errors.reindex(keys, fill_value=self.floor)
+                  + other.errors.reindex(keys, fill_value=other.floor))
+        floor = self.floor + other.floor
+        if len(counts) > self.capacity:
+            counts = counts.sort_values(ascending=False, kind='stable')
+            floor = max(floor, int(counts.iloc[self.capacity]))
+            counts = counts.iloc[:self.capacity]
+            errors = errors.reindex(counts.index)
+        return SpaceSaving(self.capacity, counts, errors, floor, self.total + other.total)
+
+    def candidates(self, k):
+        """一定包含真实 Top-k 的候选集：估计上界不低于第 k 大的下界"""
+        if len(self.counts) <= k:
+            return set(self.counts.index)
+        lower = (self.counts - self.errors).nlargest(k).iloc[-1]
+        return set(self.counts.index[self.counts >= lower])
+
+    def is_conclusive(self, k):
+        """未被记录的元素是否不可能进入 Top-k（否则需增大 capacity）"""
+        if len(self.counts) < k:
+            return self.floor == 0
+        return self.floor < (self.counts - self.errors).nlargest(k).iloc[-1]
+
+    def top(self, k):
+        est = self.counts.nlargest(k)
+        return pd.DataFrame({'patent_id': est.index, 'estimate': est.to_numpy(),
+                             'max_error': self.errors.reindex(est.index).to_numpy()})
+
+
+def merge_summaries(a, b):
+    """合并两个摘要；按年统计时摘要为 dict(年份 -> SpaceSaving)"""
+    if isinstance(a, SpaceSaving):
+        return a.merge(b)
+    merged = dict(a)
+    for year, s in b.items():
+        merged[year] = merged[year].merge(s) if year in merged else s
+    return merged
+
+
+# ---------------- 分块工作进程 ----------------
+
+_DOMAIN = None
+_YEAR_LOOKUP = None   # (专利号词表, 授权年份)，仅按年统计时使用
+
+
+def _init_worker(domain, year_files=None):
+    global _DOMAIN, _YEAR_LOOKUP
+    _DOMAIN = domain
+    # 索引已由主进程建好，工作进程只以 mmap 方式打开，不会各自重复构建
+    _YEAR_LOOKUP = tuple(np.load(f, mmap_mode='r') for f in year_files) if year_files else None
+
+
+def _year_index_files():
+    """在启动进程池之前加载（必要时构建）一次专利年份索引，返回其文件路径"""
+    pi.load_patent_index()
+    return tuple(os.path.join(pi.INDEX_DIR, name) for name in ('patent_ids.npy', 'patent_year.npy'))
+
+
+def _citing_years(citing_ids, lookup):
+    vocab, patent_year = lookup
+    rows = pi.encode_patents(citing_ids, vocab)
+    return np.where(rows >= 0, np.asarray(patent_year)[np.maximum(rows, 0)], 0)
+
+
+def _chunk_summary(args):
+    chunk, capacity, per_year = args
+    if _DOMAIN is not None:
+        chunk = chunk[chunk['citation_patent_id'].isin(_DOMAIN)]
+    if not per_year:
+        return SpaceSaving.from_values(chunk['citation_patent_id'].to_numpy(), capacity)
+    years = _citing_years(chunk['patent_id'], _YEAR_LOOKUP)
+    return {int(y): SpaceSaving.from_values(g.to_numpy(), capacity)
+            for y, g in chunk['citation_patent_id'].groupby(years) if y > 0}
+
+
+def _iter_chunks(zip_path, per_year, chunksize):
+    usecols = ['patent_id', 'citation_patent_id'] if per_year else ['citation_patent_id']
+    for chunk in pi.iter_tsv_chunks(zip_path, usecols, chunksize=chunksize):
+        yield chunk.dropna(subset=['citation_patent_id'])
+
+
+def sketch_citations(zip_path, capacity, domain=None, per_year=False, workers=None, chunksize=CHUNK_SIZE):
+    """第一遍：有界内存的流式扫描，各数据块在进程池中各自建摘要后合并"""
+    workers = workers or os.cpu_count() or 1
+    result, pending = None, set()
+    year_files = _year_index_files() if per_year else None
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(domain, year_files)) as pool:
+        for chunk in _iter_chunks(zip_path, per_year, chunksize):
+            # 限制在途数据块数量，内存占用与文件大小无关
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    result = fut.result() if result is None else merge_summaries(result, fut.result())
+            pending.add(pool.submit(_chunk_summary, (chunk, capacity, per_year)))
+        for fut in pending:
+            result = fut.result() if result is None else merge_summaries(result, fut.result())
+    if result is None:
+        result = {} if per_year else SpaceSaving(capacity)
+    return result
+
+
+def exact_counts(zip_path, candidates, per_year=False, chunksize=CHUNK_SIZE):
+    """第二遍：只对最终候选做精确计数"""
+    pool = set().union(*candidates.values()) if per_year else set(candidates)
+    lookup = pi.load_patent_index() if per_year else None
+    parts = []
+    for chunk in _iter_chunks(zip_path, per_year, chunksize):
+        chunk = chunk[chunk['citation_patent_id'].isin(pool)]
+        if chunk.empty:
+            continue
+        if per_year:
+            parts.append(pd.DataFrame({'year': _citing_years(chunk['patent_id'], lookup),
+                                       'patent_id': chunk['citation_patent_id'].to_numpy()}).value_counts())
+        else:
+            parts.append(chunk['citation_patent_id'].value_counts())
+    if not parts:
+        return pd.Series(dtype=np.int64)
+    counts = pd.concat(parts)
+    return counts.groupby(level=list(range(counts.index.nlevels))).sum()
+
+
+def top_k_cited(zip_path, k, domain=None, per_year=False, capacity=None, workers=None, chunksize=CHUNK_SIZE):
+    """
+    近似 + 精确两遍求被引最多的 Top-k 专利
+    返回 (结果表, 摘要)；结果表中 citations 为精确计数，estimate / max_error 为摘要给出的估计与误差上界
+    """
+    capacity = capacity or max(20 * k, 10000)
+    summary = sketch_citations(zip_path, capacity, domain, per_year, workers, chunksize)
+
+    if not per_year:
+        exact = exact_counts(zip_path, summary.candidates(k), chunksize=chunksize)
+        top = exact.nlargest(k)
+        result = pd.DataFrame({'patent_id': top.index, 'citations': top.to_numpy(),
+                               'estimate': summary.counts.reindex(top.index).to_numpy(),
+                               'max_error': summary.errors.reindex(top.index).to_numpy()})
+        print(f">>> 摘要误差上界: 未入选元素真实计数 ≤ {summary.floor}（总量 {summary.total}，capacity {capacity}）")
+        if not summary.is_conclusive(k):
+            print(">>> 警告: capacity 偏小，Top-k 可能遗漏未被记录的元素，建议调大 CAPACITY")
+        return result, summary
+
+    candidates = {y: s.candidates(k) for y, s in summary.items()}
+    weak = [y for y, s in summary.items() if not s.is_conclusive(k)]
+    if weak:
+        print(f">>> 警告: {len(weak)} 个年份的摘要 capacity 偏小，Top-k 可能不完整: {sorted(weak)[:10]}")
+    exact = exact_counts(zip_path, candidates, per_year=True, chunksize=chunksize)
+    frames = []
+    for year, s in sorted(summary.items()):
+        if year not in exact.index.get_level_values(0):
+            continue
+        counts = exact.xs(year, level=0)
+        top = counts[counts.index.isin(candidates[year])].nlargest(k)
+        frames.append(pd.DataFrame({'year': year, 'patent_id': top.index, 'citations': top.to_numpy(),
+                                    'estimate': s.counts.reindex(top.index).to_numpy(),
+                                    'max_error': s.errors.reindex(top.index).to_numpy()}))
+    return (pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()), summary
+
+
+def main():
+    domain = None
+    if DOMAIN_FILE:
+        domain = set(pd.read_csv(DOMAIN_FILE, dtype={'patent_id': str})['patent_id'])
+        print(f"领域清单加载完成，共 {len(domain)} 个专利。")
+    scope = "按年" if PER_YEAR else "全时段"
+    print(f"正在流式统计{scope} Top-{TOP_N} 被引专利（Space-Saving 摘要 + 候选精确复核）...")
+    result, _ = top_k_cited(FILE_CITATION, TOP_N, domain=domain, per_year=PER_YEAR,
+                            capacity=CAPACITY, workers=WORKERS, chunksize=CHUNK_SIZE)
+    result.to_csv(OUTPUT_FILE, index=False)
+    print(f"结果已保存至: {OUTPUT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
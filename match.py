@@ -1,11 +1,13 @@
 import pandas as pd
 import zipfile
+import stage_cache
 
 # ================= 配置区 =================
 ai_id_file = 'comprehensive_ai_patent_ids.csv'
 citation_zip_path = 'g_us_patent_citation.tsv.zip'
 output_file = 'ai_patent_citation_links.csv'
 target_cols = ['patent_id', 'citation_patent_id', 'citation_date']
+CHUNK_SIZE = 500000
 # ==========================================
 
 def extract_ai_citations():
@@ -38,7 +40,7 @@ def extract_ai_citations():
                 reader = pd.read_csv(
                     f, 
                     sep='\t', 
-                    chunksize=500000, # 增加到50万行一块，提高效率
+                    chunksize=CHUNK_SIZE, # 默认50万行一块，提高效率
                     low_memory=False,
                     usecols=target_cols,
                     dtype={'patent_id': str, 'citation_patent_id': str}
@@ -60,7 +62,7 @@ def extract_ai_citations():
                         first_chunk = False
                     
                     if chunk_count % 10 == 0:
-                        print(f"已扫描 {chunk_count * 500000 / 1000000:.1f} 百万行... 已捕获 {total_matches} 条记录")
+                        print(f"已扫描 {chunk_count * CHUNK_SIZE / 1000000:.1f} 百万行... 已捕获 {total_matches} 条记录")
 
         print("-" * 30)
         print(f"筛选完成！最终提取到 {total_matches} 条记录。")
@@ -69,5 +71,10 @@ def extract_ai_citations():
     except Exception as e:
         print(f"运行出错: {e}")
 
+def run():
+    return stage_cache.run_stage('match', extract_ai_citations,
+                                 inputs=[__file__, ai_id_file, citation_zip_path], outputs=[output_file],
+                                 config={'target_cols': target_cols, 'chunk': CHUNK_SIZE})
+
 if __name__ == "__main__":
-    extract_ai_citations()
\ No newline at end of file
+    run()
\ No newline at end of file
@@ -1,5 +1,4 @@
 import pandas as pd
-import plotly.graph_objects as go
 from collections import Counter
 import zipfile
 import io
@@ -14,6 +13,8 @@ OUTPUT_TXT = 'cpc_analysis_report.txt'
 # 定义你的核心 Awaker 专利号（请确保这些 ID 在边文件中存在）
 # 如果你不确定，程序会自动选取边文件中出度最高的前5个作为核心
 AWAKER_IDS = ['4901362'] # 你可以根据之前的分析在这里添加更多核心 ID
+PLOT = True   # False 时只输出文字报告，不导入 plotly
+SHOW = True   # 批量任务中设为 False，避免弹出浏览器
 # ==========================================
 
 def plot_focused_cpc_pathway():
@@ -83,7 +84,14 @@ def plot_focused_cpc_pathway():
                 })
                 report_lines.append(f"核心专利 {awaker} ({awaker_cpc}) 扩散至 {target_cpc} 领域，路径权重为 {count}")
 
-    # 3. 可视化：使用更清晰的散点连接图
+    with open(OUTPUT_TXT, 'w', encoding='utf-8') as f:
+        f.write("\n".join(report_lines))
+    print(f"分析报告已保存为：{OUTPUT_TXT}")
+    if not PLOT:
+        return
+
+    # 3. 可视化：使用更清晰的散点连接图（plotly 只在需要绘图时导入）
+    import plotly.graph_objects as go
     fig = go.Figure()
 
     # 提取唯一的领域节点
@@ -112,13 +120,11 @@ def plot_focused_cpc_pathway():
     
     # 4. 输出
     fig.write_html(OUTPUT_HTML)
-    with open(OUTPUT_TXT, 'w', encoding='utf-8') as f:
-        f.write("\n".join(report_lines))
 
     print(f"\n>>> 任务完成！")
     print(f"可视化文件已保存为：{OUTPUT_HTML}（打开后每条线代表一个 Awaker 的扩散路径，线越粗权重越大）")
-    print(f"分析报告已保存为：{OUTPUT_TXT}")
-    fig.show()
+    if SHOW:
+        fig.show()
 
 if __name__ == "__main__":
     plot_focused_cpc_pathway()
\ No newline at end of file
@@ -0,0 +1,174 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# ================= 配置区 =================
+INPUT_FILE = 'ai_patent_summary.csv'
+OUTPUT_FILE = 'sleeping_beauty_significance.csv'
+N_SAMPLES = 1000          # 每个专利的随机化引证历史数
+SEED = 20240601           # 总随机种子；结果与进程数无关、可复现
+TASK_SAMPLES = 100        # 每个并行任务负责的样本数
+BATCH_CELLS = 8000000     # 所有工作进程合计的 (样本 x 专利 x 年份) 元素上限，按进程数均分；
+                          # 每个元素计算时峰值约占 80 字节，默认合计约 640 MB
+WORKERS = None            # None 表示使用全部 CPU 核心
+# ==========================================
+
+# 零模型：同一出生年份（同一代）的专利之间随机交换引证的年份。
+# 这样每个专利的被引总数（度）不变，该代专利每年收到的引证总数不变，
+# 且交换后的引证年份对同代专利一定合法（不早于出生年份）。
+# 早于出生年份的引证记录不参与置换，但与 calculate_b_coefficient 一样参与峰值判定：
+# 出生前的最大年引证不低于出生后的峰值时，峰值落在出生之前，B 记为 0。
+
+
+def sleeping_beauty_stats(C, pre_max=None):
+    """
+    批量计算 B 系数与突发年份，C 形状为 (..., 年份)，第 0 列为出生年份
+    pre_max 为各专利出生前的最大年引证数（可与 C.max(axis=-1) 广播），None 表示没有出生前引证
+    口径与 Typical_Sleepy.calculate_b_coefficient / detect_burst_year 一致；
+    返回 (B, 突发年份相对出生的偏移；未检测到突发为 -1)
+    """
+    C = C.astype(np.float64)
+    Y = C.shape[-1]
+    t = np.arange(Y)
+
+    # B 系数：峰值取最早达到最大值的年份，参考线连接 (出生, c_birth) 与 (峰值, max_c)
+    max_c = C.max(axis=-1)
+    tp = C.argmax(axis=-1)
+    c0 = C[..., 0]
+    slope = (max_c - c0) / np.maximum(tp, 1)
+    ref = slope[..., None] * t + c0[..., None]
+    B = np.where(t <= tp[..., None], ref - C, 0).sum(axis=-1)
+    B = np.where(tp > 0, B, 0.0)
+    if pre_max is not None:
+        B = np.where(max_c > pre_max, B, 0.0)
+
+    # 突发检测：曲线截止到最后一次被引，背景为此前各年的平均引证
+    nonzero = C > 0
+    last = np.where(nonzero.any(axis=-1), Y - 1 - nonzero[..., ::-1].argmax(axis=-1), -1)
+    pad = np.concatenate([np.zeros(C.shape[:-1] + (1,)), np.cumsum(C, axis=-1),
+                          np.repeat(C.sum(axis=-1, keepdims=True), 3, axis=-1)], axis=-1)
+    prefix = pad[..., :Y]                       # prefix[i] = sum(counts[:i])
+    background = prefix / np.maximum(t, 1)
+    in_window = t + 3 <= last[..., None] + 1
+    post_avg = np.where(in_window, (pad[..., 3:Y + 3] - prefix) / 3, C)
+    burst = ((t >= 3) & (t <= last[..., None])
+             & (C > background * 2 + 1) & (C >= 3) & (post_avg >= C * 0.7))
+    burst_at = np.where(burst.any(axis=-1), burst.argmax(axis=-1), -1)
+    return B, burst_at
+
+
+def _load_cohorts(df):
+    """按出生年份分组，展开为 “专利序号 x 引证年份偏移” 的边表"""
+    items = df['citation_history'].astype(str).str.split('; ').explode()
+    items = items[items.str.contains(':', regex=False)]
+    pairs = items.str.split(':', expand=True).astype(int)
+    edges = pd.DataFrame({'row': pairs.index, 'offset': pairs[0].to_numpy()
+                          - df.loc[pairs.index, 'birth_year'].to_numpy(), 'count': pairs[1].to_numpy()})
+    pre = edges[edges['offset'] < 0]
+    pre_max = pre.groupby(['row', 'offset'])['count'].sum().groupby(level='row').max()
+    pre_max = pre_max.reindex(np.arange(len(df)), fill_value=0).to_numpy()
+    edges = edges[edges['offset'] >= 0]
+    edges_by_birth = dict(list(edges.groupby(df.loc[edges['row'], 'birth_year'].to_numpy())))
+
+    cohorts = []
+    for birth, rows in df.groupby('birth_year').groups.items():
+        rows = np.asarray(rows)
+        local = pd.Series(np.arange(len(rows)), index=rows)
+        sub = edges_by_birth.get(birth, edges.iloc[:0])
+        patent = np.repeat(local.loc[sub['row']].to_numpy(), sub['count'].to_numpy())
+        offset = np.repeat(sub['offset'].to_numpy(), sub['count'].to_numpy())
+        cohorts.append({'birth_year': int(birth), 'rows': rows, 'patent': patent, 'offset': offset,
+                        'pre_max': pre_max[rows], 'width': int(offset.max()) + 1 if len(offset) else 1})
+    return cohorts
+
+
+def _count_matrix(patent, offset, n_patents, width, n_samples):
+    """offset 形状为 (样本, 边)，返回 (样本, 专利, 年份) 计数矩阵"""
+    sample = np.arange(n_samples)[:, None]
+    idx = ((sample * n_patents + patent[None, :]) * width + offset).ravel()
+    return np.bincount(idx, minlength=n_samples * n_patents * width).reshape(n_samples, n_patents, width)
+
+
+def _run_task(args):
+    """单个并行任务：为一个出生年份队列生成一块随机样本并累计超越次数"""
+    cohort, n_samples, seed_key, b_obs, gap_obs, batch_cells = args
+    rng = np.random.default_rng(np.random.SeedSequence(seed_key))
+    patent, offset, width = cohort['patent'], cohort['offset'], cohort['width']
+    n_patents = len(cohort['rows'])
+    batch = max(1, batch_cells // max(n_patents * width, len(offset), 1))
+
+    exceed_b = np.zeros(n_patents, dtype=np.int64)
+    exceed_gap = np.zeros(n_patents, dtype=np.int64)
+    bursts = np.zeros(n_patents, dtype=np.int64)
+    done = 0
+    while done < n_samples:
+        s = min(batch, n_samples - done)
+        # 每个样本独立打乱年份池（按行置换）
+        shuffled = rng.permuted(np.tile(offset, (s, 1)), axis=1)
+        C = _count_matrix(patent, shuffled, n_patents, width, s)
+        B, burst_at = sleeping_beauty_stats(C, cohort['pre_max'])
+        exceed_b += (B >= b_obs - 1e-9).sum(axis=0)
+        exceed_gap += ((burst_at >= gap_obs) & (gap_obs >= 0)).sum(axis=0)
+        bursts += (burst_at >= 0).sum(axis=0)
+        done += s
+    return cohort['birth_year'], exceed_b, exceed_gap, bursts
+
+
+def significance(df, n_samples=N_SAMPLES, seed=SEED, workers=None):
+    """返回每个专利的观测 B、觉醒间隔及其经验 p 值"""
+    df = df[(df['birth_year'] > 0) & df['citation_history'].notna()].reset_index(drop=True)
+    cohorts = _load_cohorts(df)
+    workers = workers or os.cpu_count() or 1
+    batch_cells = max(1, BATCH_CELLS // workers)   # 各进程同时计算，内存上限按进程数均分
+
+    observed = {}
+    tasks = []
+    for c in cohorts:
+        n = len(c['rows'])
+        C = _count_matrix(c['patent'], c['offset'][None, :], n, c['width'], 1)[0]
+        b_obs, gap_obs = sleeping_beauty_stats(C, c['pre_max'])
+        observed[c['birth_year']] = (b_obs, gap_obs)
+        for block, start in enumerate(range(0, n_samples, TASK_SAMPLES)):
+            # 种子由 (总种子, 出生年份, 块号) 决定，与任务调度顺序无关
+            tasks.append((c, min(TASK_SAMPLES, n_samples - start), [seed, c['birth_year'], block],
+                          b_obs, gap_obs, batch_cells))
+
+    exceed = {c['birth_year']: [np.zeros(len(c['rows']), dtype=np.int64) for _ in range(3)] for c in cohorts}
+    print(f">>> {len(df)} 个专利、{len(cohorts)} 个出生年份队列、{len(tasks)} 个并行任务...")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for birth, e_b, e_gap, bursts in pool.map(_run_task, tasks):
+            for acc, part in zip(exceed[birth], (e_b, e_gap, bursts)):
+                acc += part
+
+    frames = []
+    for c in cohorts:
+        b_obs, gap_obs = observed[c['birth_year']]
+        e_b, e_gap, bursts = exceed[c['birth_year']]
+        frames.append(pd.DataFrame({
+            'target_patent_id': df.loc[c['rows'], 'target_patent_id'].to_numpy(),
+            'birth_year': c['birth_year'],
+            'total_citations': df.loc[c['rows'], 'total_citations'].to_numpy(),
+            'B_index': b_obs,
+            'awakening_gap': np.where(gap_obs >= 0, gap_obs, np.nan),
+            'p_B': (1 + e_b) / (n_samples + 1),
+            'p_gap': np.where(gap_obs >= 0, (1 + e_gap) / (n_samples + 1), np.nan),
+            'null_burst_rate': bursts / n_samples,
+        }))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def main():
+    print(f"正在加载 {INPUT_FILE} ...")
+    df = pd.read_csv(INPUT_FILE, dtype={'target_patent_id': str})
+    print(f"正在以度与年份保持的引证置换生成 {N_SAMPLES} 个随机样本/专利...")
+    result = significance(df, N_SAMPLES, SEED, WORKERS or os.cpu_count())
+    result.sort_values('p_B').to_csv(OUTPUT_FILE, index=False)
+    print("-" * 30)
+    print(f"显著性检验完成！p_B < 0.01 的专利 {int((result['p_B'] < 0.01).sum())} 个。")
+    print(f"结果已保存至: {OUTPUT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import patent_index as pi
+
+# ================= 配置区 =================
+EDGE_FILE = 'expanded_diffusion_edges.csv'
+OUTPUT_ORG_EDGES = 'org_diffusion_edges.csv'
+OUTPUT_ORG_YEARLY = 'org_diffusion_edges_by_year.csv'
+TARGET_IDS = ['4901362']   # “哪些企业唤醒了该专利”的目标专利，可放入上百个
+OUTPUT_AWAKENERS = 'org_awakeners.csv'
+UNKNOWN_ASSIGNEE = 'Individual/Unknown'
+# ==========================================
+
+
+def _expand_assignees(indptr, indices, rows, unknown):
+    """专利行号 -> (位置, 申请人 ID)；没有申请人记录（或不在词表中）的专利归入 unknown"""
+    pos, org = pi.csr_expand(indptr, indices, rows)
+    no_org = np.setdiff1d(np.arange(len(rows)), pos)
+    return (np.concatenate([pos, no_org]),
+            np.concatenate([org, np.full(len(no_org), unknown, dtype=np.asarray(org).dtype)]))
+
+
+def aggregate_org_graph(edges_df, by_year=True):
+    """
+    将专利级扩散网络折叠为 组织 -> 组织 的加权网络
+    Source 为施引专利，Target 为被引专利；年份取施引专利的授权年份。
+    一条专利边在两端各有多个申请人时，对每个 (施引组织, 被引组织) 组合各记 1 次；
+    没有申请人记录的一端计入 Individual/Unknown，边不会被丢弃（与 awakener_firms 一致）。
+    """
+    vocab, patent_year = pi.load_patent_index()
+    indptr, indices, names = pi.load_assignee_index()
+    names = np.asarray(list(names) + [UNKNOWN_ASSIGNEE], dtype=object)
+
+    src_rows = pi.encode_patents(edges_df['Source'], vocab)
+    tgt_rows = pi.encode_patents(edges_df['Target'], vocab)
+
+    # 分别展开两端的申请人，再按边序号连接
+    s_edge, s_org = _expand_assignees(indptr, indices, src_rows, len(names) - 1)
+    t_edge, t_org = _expand_assignees(indptr, indices, tgt_rows, len(names) - 1)
+    left = pd.DataFrame({'edge': s_edge, 'src_org': s_org})
+    right = pd.DataFrame({'edge': t_edge, 'tgt_org': t_org})
+    pairs = left.merge(right, on='edge')
+
+    keys = ['src_org', 'tgt_org']
+    if by_year:
+        years = np.asarray(patent_year)[np.maximum(src_rows, 0)]
+        pairs['Year'] = np.where(src_rows >= 0, years, 0)[pairs['edge'].to_numpy()]
+        keys.append('Year')
+
+    org_edges = pairs.groupby(keys).size().reset_index(name='Weight')
+    org_edges.insert(0, 'Source_Org', names[org_edges['src_org'].to_numpy()])
+    org_edges.insert(1, 'Target_Org', names[org_edges['tgt_org'].to_numpy()])
+    org_edges = org_edges.drop(columns=['src_org', 'tgt_org'])
+    return org_edges.sort_values(keys[2:] + ['Weight'], ascending=[True] * (len(keys) - 2) + [False])
+
+
+def collapse_years(yearly_df):
+    """把按年切片的组织网络汇总为全时段网络"""
+    return (yearly_df.groupby(['Source_Org', 'Target_Org'])['Weight'].sum()
+            .reset_index().sort_values('Weight', ascending=False))
+
+
+def awakener_firms(target_ids):
+    """
+    对每个目标专利统计其施引组织（按年），回答“哪些企业唤醒了它”
+    走 被引 -> 施引 与 专利 -> 申请人 两个 CSR 索引，任意多个目标都不需要扫描原始文件；
+    没有申请人记录的施引专利计入 Individual/Unknown（与 ana4901362.py 一致）
+    """
+    vocab, patent_year = pi.load_patent_index()
+    cited_indptr, cited_indices = pi.load_citation_index()
+    asg_indptr, asg_indices, names = pi.load_assignee_index()
+    names = np.asarray(list(names) + [UNKNOWN_ASSIGNEE], dtype=object)
+
+    target_ids = pd.Series(list(dict.fromkeys(str(t) for t in target_ids)), dtype=str)
+    missing = target_ids[pi.encode_patents(target_ids, vocab) < 0]
+    if len(missing):
+        print(f">>> 以下目标专利不在专利词表中，已跳过: {missing.tolist()[:10]}")
+
+    # 目标 -> 施引专利
+    owner, citer = pi.csr_expand(cited_indptr, cited_indices, pi.encode_patents(target_ids, vocab))
+    # 施引专利 -> 申请人；无申请人的施引专利补一个 Unknown 桶
+    c_pos, org = _expand_assignees(asg_indptr, asg_indices, citer, len(names) - 1)
+
+    citers = pd.DataFrame({
+        'Target': target_ids.to_numpy()[owner[c_pos]],
+        'assignee': names[org],
+        'Year': np.asarray(patent_year)[np.asarray(citer)[c_pos]],
+    })
+    return (citers.groupby(['Target', 'assignee', 'Year']).size().reset_index(name='Citations')
+            .rename(columns={'Target': 'target_patent_id', 'assignee': 'Assignee'})
+            .sort_values(['target_patent_id', 'Year', 'Citations'], ascending=[True, True, False]))
+
+
+def main():
+    print(f"正在加载专利级扩散网络 {EDGE_FILE}...")
+    edges_df = pd.read_csv(EDGE_FILE, dtype={'Source': str, 'Target': str})
+
+    print("正在折叠为组织级网络（按年切片）...")
+    yearly = aggregate_org_graph(edges_df, by_year=True)
+    yearly.to_csv(OUTPUT_ORG_YEARLY, index=False, encoding='utf-8-sig')
+    collapse_years(yearly).to_csv(OUTPUT_ORG_EDGES, index=False, encoding='utf-8-sig')
+
+    print(f"正在统计 {len(TARGET_IDS)} 个目标专利的唤醒企业...")
+    awakener_firms(TARGET_IDS).to_csv(OUTPUT_AWAKENERS, index=False, encoding='utf-8-sig')
+
+    print("-" * 30)
+    print(f"组织网络: {OUTPUT_ORG_EDGES}（按年: {OUTPUT_ORG_YEARLY}）")
+    print(f"唤醒企业: {OUTPUT_AWAKENERS}")
+
+
+if __name__ == "__main__":
+    main()
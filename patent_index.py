@@ -0,0 +1,420 @@
+import io
+import json
+import os
+import threading
+import zipfile
+from contextlib import contextmanager
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+import stage_cache
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+    import msvcrt
+
+# ================= 配置区 =================
+INDEX_DIR = 'indexes'
+FILE_PATENT = 'g_patent.tsv.zip'
+FILE_ASSIGNEE = 'g_assignee_disambiguated.tsv.zip'
+FILE_CITATION = 'g_us_patent_citation.tsv.zip'
+FILE_CPC = 'g_cpc_current.tsv.zip'
+CHUNK_SIZE = 1000000
+PATENT_ID_DTYPE = 'S10'   # 专利号以定长字节串存储，便于 mmap 与二分查找
+# ==========================================
+
+# 索引目录结构（全部为 .npy，可用 mmap 直接打开）：
+#   patent_ids.npy        已排序的专利号词表，行号即专利的整数 ID
+#   patent_year.npy       每个专利的授权年份（未知为 0）
+#   assignee_indptr.npy   CSR 行指针：专利行号 -> 申请人区间
+#   assignee_indices.npy  CSR 列：申请人整数 ID
+#   assignee_names.txt    申请人整数 ID -> 消歧后的组织名称（每行一个）
+#   cited_indptr.npy      CSR 行指针：被引专利行号 -> 施引专利区间
+#   cited_indices.npy     CSR 列：施引专利行号
+#   cpc_indptr.npy        CSR 行指针：专利行号 -> CPC 小类区间（第一个为主分类）
+#   cpc_indices.npy       CSR 列：CPC 小类整数 ID
+#   cpc_names.txt         CPC 小类整数 ID -> 小类代码（如 G06V）
+#   <索引>_sources.json   生成该索引时各源压缩包的 sha256；源文件变化后 load_* 自动重建
+# load_* 在同一进程内只打开一次，多个子命令串联时共享同一组 mmap 句柄
+# 构建在 .build.lock 文件锁内进行，同时启动的多个任务只有一个会构建，其余等待后直接加载；
+# 所有文件先写临时文件再原子替换，<索引>_sources.json 最后写入，作为索引完整可用的标志
+# 除专利词表外，其余索引都以词表行号编码，因此也依赖 FILE_PATENT
+
+
+def _path(name):
+    return os.path.join(INDEX_DIR, name)
+
+
+def _open_tsv(z):
+    """在压缩包中定位真正的 TSV 文件"""
+    tsv_names = [f for f in z.namelist() if f.endswith('.tsv') and not f.startswith('__MACOSX')]
+    return z.open(tsv_names[0] if tsv_names else z.namelist()[0])
+
+
+def _read_header(zip_path):
+    with zipfile.ZipFile(zip_path) as z:
+        with _open_tsv(z) as f:
+            return pd.read_csv(f, sep='\t', nrows=0).columns.tolist()
+
+
+def iter_tsv_chunks(zip_path, usecols, chunksize=CHUNK_SIZE):
+    """流式读取压缩包内的 TSV，所有列按字符串读入"""
+    with zipfile.ZipFile(zip_path) as z:
+        with _open_tsv(z) as f:
+            reader = pd.read_csv(f, sep='\t', chunksize=chunksize, low_memory=False,
+                                 usecols=usecols, dtype=str)
+            for chunk in reader:
+                yield chunk
+
+
+# ---------------- CSR 工具 ----------------
+
+def build_csr(rows, cols, n_rows):
+    """由 (行, 列) 对构建去重后的 CSR，列在行内保持首次出现的顺序"""
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    # 稳定排序保证行内顺序与原始顺序一致（例如 assignee_sequence / cpc_sequence）
+    order = np.argsort(rows, kind='stable')
+    rows, cols = rows[order], cols[order]
+    if len(rows):
+        pairs = pd.DataFrame({'r': rows, 'c': cols})
+        keep = ~pairs.duplicated().to_numpy()
+        rows, cols = rows[keep], cols[keep]
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+    return indptr, cols.astype(np.int32)
+
+
+def csr_expand(indptr, indices, rows):
+    """向量化展开 CSR：返回 (输入位置, 列值)，输入行号为 -1 时跳过"""
+    rows = np.asarray(rows, dtype=np.int64)
+    valid = np.flatnonzero(rows >= 0)
+    starts = indptr[rows[valid]]
+    counts = indptr[rows[valid] + 1] - starts
+    total = int(counts.sum())
+    owner = np.repeat(valid, counts)
+    # 每个元素在所属区间内的偏移量
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owner, np.asarray(indices[np.repeat(starts, counts) + offsets])
+
+
+def save_array(filename, array):
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    stage_cache.atomic_write(_path(filename), lambda f: np.save(f, array))
+
+
+def save_csr(prefix, indptr, indices):
+    save_array(f'{prefix}_indptr.npy', indptr)
+    save_array(f'{prefix}_indices.npy', indices)
+
+
+def load_csr(prefix):
+    return (np.load(_path(f'{prefix}_indptr.npy'), mmap_mode='r'),
+            np.load(_path(f'{prefix}_indices.npy'), mmap_mode='r'))
+
+
+def save_names(filename, names):
+    def write(f):
+        text = io.TextIOWrapper(f, encoding='utf-8')
+        for name in names:
+            text.write(str(name).replace('\n', ' ').replace('\r', ' ') + '\n')
+        text.flush()
+        text.detach()
+    stage_cache.atomic_write(_path(filename), write)
+
+
+def load_names(filename):
+    with open(_path(filename), encoding='utf-8') as f:
+        return [line.rstrip('\n') for line in f]
+
+
+def _source_hashes(sources):
+    return {os.path.basename(s): stage_cache.file_hash(s) for s in sources}
+
+
+def save_sources(name, sources):
+    """记录源文件哈希；必须在该索引的全部文件写完之后调用"""
+    raw = json.dumps(_source_hashes(sources), indent=1).encode('utf-8')
+    stage_cache.atomic_write(_path(f'{name}_sources.json'), lambda f: f.write(raw))
+
+
+def is_current(index_file, name, sources):
+    """索引存在且源文件与生成时一致；本地没有的源文件不参与比较（沿用现有索引）"""
+    if not os.path.exists(_path(index_file)):
+        return False
+    try:
+        with open(_path(f'{name}_sources.json'), encoding='utf-8') as f:
+            built = json.load(f)
+    except (OSError, ValueError):
+        built = {}
+    current = {k: v for k, v in _source_hashes(sources).items() if v != 'missing'}
+    return all(built.get(k) == v for k, v in current.items())
+
+
+_THREAD_LOCK = threading.RLock()
+_lock_depth = 0
+
+
+@contextmanager
+def _file_lock():
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    with open(_path('.build.lock'), 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:   # LK_LOCK 重试 10 秒后仍未拿到锁，继续等待
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def build_lock():
+    """跨进程的索引构建锁；同一线程内可重入（构建申请人索引时会先加载专利词表）"""
+    global _lock_depth
+    with _THREAD_LOCK:
+        _lock_depth += 1
+        try:
+            if _lock_depth > 1:
+                yield
+            else:
+                with _file_lock():
+                    yield
+        finally:
+            _lock_depth -= 1
+
+
+def ensure_index(index_file, name, sources, build):
+    """索引缺失或源文件变化时在锁内重建；拿到锁后再检查一次，等待期间可能已由其他进程建好"""
+    if is_current(index_file, name, sources):
+        return
+    with build_lock():
+        if is_current(index_file, name, sources):
+            return
+        print(f">>> 索引 {name} 缺失或源文件已变化，重新构建...")
+        _invalidate(name)
+        build()
+
+
+def _invalidate(name):
+    """删除完整性标志，未持锁的进程在重建期间会判定索引过期并等待锁"""
+    try:
+        os.remove(_path(f'{name}_sources.json'))
+    except FileNotFoundError:
+        pass
+
+
+def encode_names(values, vocab):
+    """字符串 -> 整数 ID，新字符串追加到 vocab（dict: 名称 -> ID）"""
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    mapped = np.array([vocab.setdefault(u, len(vocab)) for u in uniques], dtype=np.int64)
+    return mapped[codes]
+
+
+# ---------------- 专利词表与年份索引 ----------------
+
+def build_patent_index():
+    """扫描 g_patent，生成专利号词表与授权年份索引"""
+    print(f"正在从 {FILE_PATENT} 构建专利词表与年份索引...")
+    header = _read_header(FILE_PATENT)
+    pid_col = 'patent_id' if 'patent_id' in header else 'id'
+    date_col = 'patent_date' if 'patent_date' in header else 'date'
+
+    id_parts, year_parts = [], []
+    for chunk in iter_tsv_chunks(FILE_PATENT, [pid_col, date_col]):
+        chunk = chunk.dropna(subset=[pid_col])
+        id_parts.append(chunk[pid_col].str.strip().to_numpy(dtype=PATENT_ID_DTYPE))
+        years = pd.to_numeric(chunk[date_col].str[:4], errors='coerce').fillna(0)
+        year_parts.append(years.to_numpy(dtype=np.int16))
+
+    ids = np.concatenate(id_parts)
+    years = np.concatenate(year_parts)
+    order = np.argsort(ids, kind='stable')
+    ids, years = ids[order], years[order]
+    keep = np.ones(len(ids), dtype=bool)
+    keep[1:] = ids[1:] != ids[:-1]
+
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    save_array('patent_ids.npy', ids[keep])
+    save_array('patent_year.npy', years[keep])
+    save_sources('patent', [FILE_PATENT])
+    print(f">>> 专利词表完成，共 {int(keep.sum())} 个专利。")
+
+
+@lru_cache(maxsize=None)
+def load_patent_index():
+    ensure_index('patent_ids.npy', 'patent', [FILE_PATENT], build_patent_index)
+    return (np.load(_path('patent_ids.npy'), mmap_mode='r'),
+            np.load(_path('patent_year.npy'), mmap_mode='r'))
+
+
+def encode_patents(patent_ids, vocab):
+    """专利号 -> 词表行号，词表中不存在的返回 -1"""
+    keys = np.asarray(pd.Series(patent_ids, dtype=str).str.strip(), dtype=PATENT_ID_DTYPE)
+    if len(vocab) == 0:
+        return np.full(len(keys), -1, dtype=np.int64)
+    pos = np.searchsorted(vocab, keys)
+    pos = np.minimum(pos, len(vocab) - 1)
+    return np.where(vocab[pos] == keys, pos, -1).astype(np.int64)
+
+
+def decode_patents(rows, vocab):
+    return np.asarray(vocab[np.asarray(rows, dtype=np.int64)]).astype(str)
+
+
+# ---------------- 申请人索引 ----------------
+
+def build_assignee_index():
+    """扫描一次 g_assignee_disambiguated，生成 专利 -> 申请人 的 CSR 索引"""
+    vocab, _ = load_patent_index()
+    print(f"正在从 {FILE_ASSIGNEE} 构建申请人索引...")
+    header = _read_header(FILE_ASSIGNEE)
+    pid_col = 'patent_id' if 'patent_id' in header else 'id'
+    org_col = 'disambig_assignee_organization' if 'disambig_assignee_organization' in header else 'organization'
+    seq_col = 'assignee_sequence' if 'assignee_sequence' in header else None
+    usecols = [pid_col, org_col] + ([seq_col] if seq_col else [])
+
+    names = {}
+    row_parts, col_parts, seq_parts = [], [], []
+    for chunk in iter_tsv_chunks(FILE_ASSIGNEE, usecols):
+        chunk = chunk.dropna(subset=[pid_col, org_col])
+        rows = encode_patents(chunk[pid_col], vocab)
+        found = rows >= 0
+        chunk = chunk[found]
+        row_parts.append(rows[found])
+        col_parts.append(encode_names(chunk[org_col].str.strip().to_numpy(), names))
+        if seq_col:
+            seq_parts.append(pd.to_numeric(chunk[seq_col], errors='coerce').fillna(0).to_numpy(dtype=np.int64))
+
+    rows = np.concatenate(row_parts) if row_parts else np.empty(0, dtype=np.int64)
+    cols = np.concatenate(col_parts) if col_parts else np.empty(0, dtype=np.int64)
+    if seq_parts:
+        # 先按 assignee_sequence 排序，保证每个专利的第一申请人排在最前
+        order = np.argsort(np.concatenate(seq_parts), kind='stable')
+        rows, cols = rows[order], cols[order]
+
+    indptr, indices = build_csr(rows, cols, len(vocab))
+    save_csr('assignee', indptr, indices)
+    save_names('assignee_names.txt', names.keys())
+    save_sources('assignee', [FILE_PATENT, FILE_ASSIGNEE])
+    print(f">>> 申请人索引完成：{len(names)} 个组织，{len(indices)} 条专利-组织关系。")
+
+
+@lru_cache(maxsize=None)
+def load_assignee_index():
+    ensure_index('assignee_indptr.npy', 'assignee', [FILE_PATENT, FILE_ASSIGNEE], build_assignee_index)
+    indptr, indices = load_csr('assignee')
+    return indptr, indices, load_names('assignee_names.txt')
+
+
+def patent_assignees(patent_ids):
+    """索引连接：返回 DataFrame[patent_id, assignee]，一个专利可对应多个申请人"""
+    vocab, _ = load_patent_index()
+    indptr, indices, names = load_assignee_index()
+    patent_ids = pd.Series(list(patent_ids), dtype=str)
+    owner, org = csr_expand(indptr, indices, encode_patents(patent_ids, vocab))
+    return pd.DataFrame({
+        'patent_id': patent_ids.to_numpy()[owner],
+        'assignee': np.asarray(names, dtype=object)[org] if len(org) else np.empty(0, dtype=object),
+    })
+
+
+# ---------------- 引证索引 ----------------
+
+def build_citation_index():
+    """扫描一次 g_us_patent_citation，生成 被引专利 -> 施引专利 的 CSR 索引"""
+    vocab, _ = load_patent_index()
+    print(f"正在从 {FILE_CITATION} 构建引证索引（只需运行一次）...")
+    citer_parts, cited_parts = [], []
+    dropped = 0
+    for chunk in iter_tsv_chunks(FILE_CITATION, ['patent_id', 'citation_patent_id'], chunksize=2 * CHUNK_SIZE):
+        citer = encode_patents(chunk['patent_id'], vocab)
+        cited = encode_patents(chunk['citation_patent_id'], vocab)
+        # 1976 年以前的被引专利不在 g_patent 词表中，无法建立整数 ID
+        found = (citer >= 0) & (cited >= 0)
+        dropped += int((~found).sum())
+        citer_parts.append(citer[found])
+        cited_parts.append(cited[found])
+
+    indptr, indices = build_csr(np.concatenate(cited_parts), np.concatenate(citer_parts), len(vocab))
+    save_csr('cited', indptr, indices)
+    save_sources('cited', [FILE_PATENT, FILE_CITATION])
+    print(f">>> 引证索引完成：{len(indices)} 条引证边（跳过词表外 {dropped} 条）。")
+
+
+@lru_cache(maxsize=None)
+def load_citation_index():
+    ensure_index('cited_indptr.npy', 'cited', [FILE_PATENT, FILE_CITATION], build_citation_index)
+    return load_csr('cited')
+
+
+# ---------------- CPC 索引 ----------------
+
+def build_cpc_index():
+    """扫描一次 g_cpc_current，生成 专利 -> CPC 小类 的 CSR 索引"""
+    vocab, _ = load_patent_index()
+    print(f"正在从 {FILE_CPC} 构建 CPC 索引...")
+    header = _read_header(FILE_CPC)
+    pid_col = 'patent_id' if 'patent_id' in header else 'id'
+    sub_col = 'cpc_subclass' if 'cpc_subclass' in header else 'cpc_group'
+    seq_col = 'cpc_sequence' if 'cpc_sequence' in header else None
+    usecols = [pid_col, sub_col] + ([seq_col] if seq_col else [])
+
+    names = {}
+    row_parts, col_parts, seq_parts = [], [], []
+    for chunk in iter_tsv_chunks(FILE_CPC, usecols):
+        chunk = chunk.dropna(subset=[pid_col, sub_col])
+        rows = encode_patents(chunk[pid_col], vocab)
+        found = rows >= 0
+        chunk = chunk[found]
+        row_parts.append(rows[found])
+        # 统一截取到小类（前 4 位），与 migrate.py 的领域粒度一致
+        col_parts.append(encode_names(chunk[sub_col].str.strip().str[:4].to_numpy(), names))
+        if seq_col:
+            seq_parts.append(pd.to_numeric(chunk[seq_col], errors='coerce').fillna(0).to_numpy(dtype=np.int64))
+
+    rows = np.concatenate(row_parts)
+    cols = np.concatenate(col_parts)
+    if seq_parts:
+        order = np.argsort(np.concatenate(seq_parts), kind='stable')
+        rows, cols = rows[order], cols[order]
+
+    indptr, indices = build_csr(rows, cols, len(vocab))
+    save_csr('cpc', indptr, indices)
+    save_names('cpc_names.txt', names.keys())
+    save_sources('cpc', [FILE_PATENT, FILE_CPC])
+    print(f">>> CPC 索引完成：{len(names)} 个小类，{len(indices)} 条专利-小类关系。")
+
+
+@lru_cache(maxsize=None)
+def load_cpc_index():
+    ensure_index('cpc_indptr.npy', 'cpc', [FILE_PATENT, FILE_CPC], build_cpc_index)
+    indptr, indices = load_csr('cpc')
+    return indptr, indices, load_names('cpc_names.txt')
+
+
+def build_all():
+    with build_lock():
+        for name in ('patent', 'cited', 'assignee', 'cpc'):
+            _invalidate(name)
+        build_patent_index()
+        build_citation_index()
+        build_assignee_index()
+        build_cpc_index()
+
+
+if __name__ == "__main__":
+    build_all()
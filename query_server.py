@@ -0,0 +1,205 @@
+import asyncio
+import json
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import patent_index as pi
+
+# ================= 配置区 =================
+HOST = '127.0.0.1'
+PORT = 8765
+CACHE_SIZE = 4096      # LRU 结果缓存条目数
+WORKERS = 8            # 并发执行查询的线程数（numpy 运算会释放 GIL）
+MAX_K = 4              # k-hop 最大跳数
+MAX_NODES = 5000       # 单层返回的节点上限，防止响应过大
+# ==========================================
+
+# 索引在进程启动时通过 mmap 加载一次，之后所有请求共享
+INDEX = {}
+
+
+def load_indexes():
+    print(f">>> 正在加载索引目录 {pi.INDEX_DIR}（mmap）...")
+    INDEX['vocab'], INDEX['year'] = pi.load_patent_index()
+    INDEX['cited_indptr'], INDEX['cited_indices'] = pi.load_citation_index()
+    INDEX['cpc_indptr'], INDEX['cpc_indices'], INDEX['cpc_names'] = pi.load_cpc_index()
+    INDEX['asg_indptr'], INDEX['asg_indices'], INDEX['asg_names'] = pi.load_assignee_index()
+    print(f">>> 索引加载完成，共 {len(INDEX['vocab'])} 个专利。")
+
+
+class QueryError(ValueError):
+    pass
+
+
+def _row(patent_id):
+    row = int(pi.encode_patents([patent_id], INDEX['vocab'])[0])
+    if row < 0:
+        raise QueryError(f"未知专利号: {patent_id}")
+    return row
+
+
+def _citer_rows(rows):
+    _, citers = pi.csr_expand(INDEX['cited_indptr'], INDEX['cited_indices'], rows)
+    return citers
+
+
+def _primary_cpc(rows):
+    """每个专利的主 CPC 小类（CSR 区间内第一个），没有则为 None"""
+    indptr, indices, names = INDEX['cpc_indptr'], INDEX['cpc_indices'], INDEX['cpc_names']
+    rows = np.asarray(rows, dtype=np.int64)
+    has = indptr[rows + 1] > indptr[rows]
+    first = np.asarray(indices[np.where(has, indptr[rows], 0)])
+    return [names[c] if h else None for c, h in zip(first, has)]
+
+
+# ---------------- 查询（结果经 LRU 缓存） ----------------
+
+@lru_cache(maxsize=CACHE_SIZE)
+def citers(target):
+    """引用了 target 的全部专利及其授权年份"""
+    rows = _citer_rows([_row(target)])
+    years = np.asarray(INDEX['year'])[rows]
+    ids = pi.decode_patents(rows, INDEX['vocab'])
+    order = np.lexsort((ids, years))
+    return {'target': target, 'count': int(len(rows)),
+            'citers': [{'id': ids[i], 'year': int(years[i])} for i in order]}
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def k_hop(target, k):
+    """从 target 出发沿“被引 -> 施引”方向扩散 k 层，每个节点只归入最先到达的层"""
+    if not 1 <= k <= MAX_K:
+        raise QueryError(f"k 必须在 1 到 {MAX_K} 之间")
+    seen = np.zeros(len(INDEX['vocab']), dtype=bool)
+    frontier = np.array([_row(target)], dtype=np.int64)
+    seen[frontier] = True
+    layers = []
+    for depth in range(1, k + 1):
+        nxt = np.unique(_citer_rows(frontier))
+        nxt = nxt[~seen[nxt]]
+        seen[nxt] = True
+        layers.append({'layer': depth, 'count': int(len(nxt)),
+                       'nodes': pi.decode_patents(nxt[:MAX_NODES], INDEX['vocab']).tolist(),
+                       'truncated': bool(len(nxt) > MAX_NODES)})
+        if not len(nxt):
+            break
+        frontier = nxt
+    return {'target': target, 'k': k, 'layers': layers}
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def cpc_transitions(ids):
+    """每个 Awaker 的主 CPC 小类 -> 其施引专利主 CPC 小类的迁移权重（同 migrate.py 口径）"""
+    transitions = []
+    for awaker in ids:
+        row = _row(awaker)
+        source_field = _primary_cpc([row])[0] or 'Unknown'
+        counts = Counter(c for c in _primary_cpc(_citer_rows([row])) if c)
+        for target_field, weight in counts.most_common():
+            transitions.append({'awaker': awaker, 'source_field': source_field,
+                                'target_field': target_field, 'weight': weight})
+    return {'ids': list(ids), 'transitions': transitions}
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def history(patent_id):
+    """逐年被引历史，格式与 ai_patent_summary.csv 的 citation_history 一致"""
+    row = _row(patent_id)
+    years = np.asarray(INDEX['year'])[_citer_rows([row])]
+    years = years[years > 0]
+    uniq, counts = np.unique(years, return_counts=True)
+    asg_indptr, asg_indices = INDEX['asg_indptr'], INDEX['asg_indices']
+    assignees = [INDEX['asg_names'][a] for a in asg_indices[asg_indptr[row]:asg_indptr[row + 1]]]
+    return {'id': patent_id, 'birth_year': int(INDEX['year'][row]), 'assignees': assignees,
+            'total_citations': int(counts.sum()),
+            'citation_history': "; ".join(f"{y}:{c}" for y, c in zip(uniq, counts))}
+
+
+def _ids_param(params):
+    ids = [i.strip() for v in params.get('ids', []) for i in v.split(',') if i.strip()]
+    if not ids:
+        raise QueryError("缺少参数 ids")
+    return tuple(ids)
+
+
+def _one(params, name):
+    if name not in params:
+        raise QueryError(f"缺少参数 {name}")
+    return params[name][0].strip()
+
+
+ROUTES = {
+    '/citers': lambda p: citers(_one(p, 'target')),
+    '/khop': lambda p: k_hop(_one(p, 'target'), int(p.get('k', ['2'])[0])),
+    '/cpc_transitions': lambda p: cpc_transitions(_ids_param(p)),
+    '/history': lambda p: history(_one(p, 'id')),
+}
+
+CACHED = [citers, k_hop, cpc_transitions, history]
+
+
+def cache_stats():
+    return {f.__name__: f.cache_info()._asdict() for f in CACHED}
+
+
+# ---------------- HTTP 服务 ----------------
+
+async def handle(reader, writer, executor):
+    start = time.perf_counter()
+    status, body = 200, None
+    path = '?'
+    try:
+        request_line = (await reader.readline()).decode('latin-1').strip()
+        # 丢弃请求头
+        while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+            pass
+        method, target, _ = request_line.split(' ', 2)
+        url = urlsplit(target)
+        path, params = url.path, parse_qs(url.query)
+        if method != 'GET':
+            status, body = 405, {'error': '只支持 GET'}
+        elif path == '/stats':
+            body = cache_stats()
+        elif path not in ROUTES:
+            status, body = 404, {'error': f"未知接口 {path}", 'routes': sorted(ROUTES) + ['/stats']}
+        else:
+            loop = asyncio.get_running_loop()
+            body = await loop.run_in_executor(executor, ROUTES[path], params)
+    except (QueryError, ValueError) as e:
+        status, body = 400, {'error': str(e)}
+    except Exception as e:
+        status, body = 500, {'error': f"{type(e).__name__}: {e}"}
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    payload = json.dumps({'elapsed_ms': round(elapsed_ms, 3), 'result': body} if status == 200
+                         else dict(body, elapsed_ms=round(elapsed_ms, 3)), ensure_ascii=False).encode('utf-8')
+    reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}.get(status, 'Error')
+    writer.write(f"HTTP/1.1 {status} {reason}\r\n"
+                 f"Content-Type: application/json; charset=utf-8\r\n"
+                 f"Content-Length: {len(payload)}\r\n"
+                 f"X-Elapsed-Ms: {elapsed_ms:.3f}\r\n"
+                 f"Connection: close\r\n\r\n".encode('latin-1') + payload)
+    try:
+        await writer.drain()
+    finally:
+        writer.close()
+    print(f"[{status}] {path} {elapsed_ms:.1f} ms")
+
+
+async def serve():
+    load_indexes()
+    executor = ThreadPoolExecutor(max_workers=WORKERS)
+    server = await asyncio.start_server(lambda r, w: handle(r, w, executor), HOST, PORT)
+    print(f">>> 查询服务已启动: http://{HOST}:{PORT}")
+    print(f">>> 示例: /citers?target=4901362  /khop?target=4901362&k=2  "
+          f"/cpc_transitions?ids=4901362  /history?id=4901362  /stats")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(serve())
@@ -0,0 +1,147 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from Typical_Sleepy import parse_history
+
+# ================= 配置区 =================
+INPUT_FILE = 'kleinberg_star_beauties.csv'
+OUTPUT_DIR = 'beauty_curves'                       # 每页一张 PNG 小多图
+OUTPUT_PDF = 'kleinberg_star_beauties_curves.pdf'  # 全部页面合并成的多页 PDF，设为 None 则只输出 PNG
+                                                   # 安装了 pypdf 时为矢量 PDF，否则由 PNG 逐页拼成位图 PDF
+GRID = (4, 4)        # 每页 行 x 列
+DPI = 100
+WORKERS = None       # None 表示使用全部 CPU 核心
+# ==========================================
+
+# 每个工作进程只创建一次画布，逐页清空坐标轴后复用
+_FIG = None
+_AXES = None
+
+
+def _init_worker(grid, dpi):
+    global _FIG, _AXES
+    import matplotlib
+    matplotlib.use('Agg')   # 非交互后端，不弹窗
+    import matplotlib.pyplot as plt
+    from matplotlib.lines import Line2D
+
+    rows, cols = grid
+    _FIG, axes = plt.subplots(rows, cols, figsize=(cols * 4, rows * 2.8), dpi=dpi)
+    _AXES = list(axes.flat) if hasattr(axes, 'flat') else [axes]
+    handles = [
+        Line2D([], [], color='#1f77b4', marker='o', markersize=3, label='Annual citations'),
+        Line2D([], [], color='orange', linestyle='--', label='B reference line'),
+        Line2D([], [], color='gray', linestyle=':', label='Birth'),
+        Line2D([], [], color='red', linestyle='--', label='Awakening'),
+        Line2D([], [], color='green', linestyle='-.', label='Peak'),
+    ]
+    _FIG.legend(handles=handles, loc='lower center', ncol=len(handles), frameon=False)
+    _FIG.subplots_adjust(left=0.05, right=0.98, top=0.95, bottom=0.08, hspace=0.55, wspace=0.25)
+
+
+def _draw_curve(ax, rec):
+    """单个睡美人的引证曲线：出生 / 觉醒 / 峰值年份与 B 指数参考线"""
+    history = parse_history(rec['citation_history'])
+    if not history:
+        ax.set_title(f"{rec['target_patent_id']} (no history)", fontsize=9)
+        return
+
+    birth = int(rec['birth_year'])
+    last = max(history)
+    years = list(range(min(birth, min(history)), last + 1))
+    counts = [history.get(y, 0) for y in years]
+    ax.plot(years, counts, marker='o', markersize=2.5, color='#1f77b4', linewidth=1.2)
+    ax.fill_between(years, counts, color='skyblue', alpha=0.3)
+
+    # 与 calculate_b_coefficient 相同：峰值取最早达到最大值的年份，参考线连接 (出生, c_birth) 与 (峰值, max_c)
+    max_c = max(history.values())
+    peak = [y for y, c in history.items() if c == max_c][0]
+    if peak > birth:
+        c_birth = history.get(birth, 0)
+        ref_years = list(range(birth, peak + 1))
+        ref = [(max_c - c_birth) / (peak - birth) * (t - birth) + c_birth for t in ref_years]
+        ax.plot(ref_years, ref, color='orange', linestyle='--', linewidth=1)
+        ax.fill_between(ref_years, ref, [history.get(t, 0) for t in ref_years], color='orange', alpha=0.12)
+
+    ax.axvline(birth, color='gray', linestyle=':', linewidth=1)
+    ax.axvline(peak, color='green', linestyle='-.', linewidth=1)
+    awakening = rec.get('awakening_year')
+    if pd.notna(awakening):
+        ax.axvline(float(awakening), color='red', linestyle='--', linewidth=1)
+        ax.annotate(f"{int(awakening)}", (float(awakening), max_c), fontsize=7, color='red',
+                    xytext=(2, -8), textcoords='offset points')
+
+    ax.set_title(f"{rec['target_patent_id']}  B={float(rec['B_index']):.0f}  "
+                 f"gap={rec['substantive_gap']:.0f}y  n={int(rec['total_citations'])}", fontsize=9)
+    ax.tick_params(labelsize=7)
+    ax.grid(axis='y', linestyle='--', alpha=0.5)
+
+
+def _render_page(args):
+    page_no, records, output_dir, vector = args
+    for ax, rec in zip(_AXES, records + [None] * (len(_AXES) - len(records))):
+        ax.clear()
+        ax.set_visible(rec is not None)
+        if rec is not None:
+            _draw_curve(ax, rec)
+    path = os.path.join(output_dir, f"page_{page_no:04d}.png")
+    _FIG.savefig(path)
+    if vector:
+        _FIG.savefig(path[:-4] + '.pdf')   # 同一画布再输出一份单页矢量 PDF
+    return path
+
+
+def _pdf_writer():
+    """pypdf 为可选依赖，只在需要合并矢量 PDF 时导入"""
+    try:
+        from pypdf import PdfWriter
+    except ImportError:
+        return None
+    return PdfWriter
+
+
+def _merge_pdf(paths, output_pdf, writer_cls=None):
+    """逐页合并为多页 PDF：有 pypdf 时合并各页矢量 PDF，否则逐页追加 PNG，内存中只保留一页"""
+    if writer_cls is not None:
+        writer = writer_cls()
+        for path in paths:
+            writer.append(path[:-4] + '.pdf')
+        with open(output_pdf, 'wb') as f:
+            writer.write(f)
+        return
+
+    from PIL import Image   # Pillow 为 matplotlib 的依赖
+    for i, path in enumerate(paths):
+        with Image.open(path) as page:
+            page.convert('RGB').save(output_pdf, append=i > 0, resolution=DPI)
+
+
+def render_all():
+    df = pd.read_csv(INPUT_FILE, dtype={'target_patent_id': str})
+    records = df.to_dict('records')
+    per_page = GRID[0] * GRID[1]
+    n_pages = math.ceil(len(records) / per_page)
+    if not n_pages:
+        print("没有可绘制的睡美人。")
+        return []
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    print(f"正在并行绘制 {len(records)} 条引证曲线，共 {n_pages} 页...")
+
+    writer_cls = _pdf_writer() if OUTPUT_PDF else None
+    tasks = [(i + 1, records[i * per_page:(i + 1) * per_page], OUTPUT_DIR, writer_cls is not None)
+             for i in range(n_pages)]
+    with ProcessPoolExecutor(max_workers=WORKERS, initializer=_init_worker, initargs=(GRID, DPI)) as pool:
+        paths = list(pool.map(_render_page, tasks, chunksize=max(1, n_pages // (4 * (os.cpu_count() or 1)))))
+
+    if OUTPUT_PDF:
+        _merge_pdf(paths, OUTPUT_PDF, writer_cls)
+        kind = "矢量 PDF" if writer_cls is not None else "位图 PDF（安装 pypdf 可输出矢量 PDF）"
+        print(f"多页{kind}已保存至: {OUTPUT_PDF}")
+    print(f"分页 PNG 已保存至: {OUTPUT_DIR}/")
+    return paths
+
+
+if __name__ == "__main__":
+    render_all()
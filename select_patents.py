@@ -1,6 +1,7 @@
 import pandas as pd
 import zipfile
 import io
+import stage_cache
 
 # ================= 配置区 =================
 # 1. 你的压缩包完整文件名
@@ -8,6 +9,7 @@ zip_file_path = 'g_ipc_at_issue.tsv.zip'
 
 # 2. 导出结果的文件名
 output_file = 'comprehensive_ai_patent_ids.csv'
+CHUNK_SIZE = 100000
 
 # 3. 定义全年代 AI IPC 核心索引 (拼接后无空格模式)
 ai_prefixes = (
@@ -48,7 +50,7 @@ def process_tsv_from_zip():
                 reader = pd.read_csv(
                     f, 
                     sep='\t', 
-                    chunksize=100000, 
+                    chunksize=CHUNK_SIZE, 
                     low_memory=False, 
                     # 只取关键列，大幅降低内存压力
                     usecols=['patent_id', 'section', 'ipc_class', 'subclass', 'main_group', 'subgroup']
@@ -73,14 +75,14 @@ def process_tsv_from_zip():
                     ai_id_set.update(match_ids)
                     
                     if chunk_count % 10 == 0:
-                        print(f"已扫描 {chunk_count * 100000} 行数据... 已找到 {len(ai_id_set)} 个候选专利")
+                        print(f"已扫描 {chunk_count * CHUNK_SIZE} 行数据... 已找到 {len(ai_id_set)} 个候选专利")
 
         # 5. 保存结果
         result_df = pd.DataFrame({'patent_id': list(ai_id_set)})
         result_df.to_csv(output_file, index=False)
         
         print("-" * 30)
-        print(f"筛选完成！共处理 {chunk_count * 100000} 行数据。")
+        print(f"筛选完成！共处理 {chunk_count * CHUNK_SIZE} 行数据。")
         print(f"最终提取出 AI 相关专利: {len(ai_id_set)} 条。")
         print(f"结果已保存至: {output_file}")
 
@@ -89,5 +91,10 @@ def process_tsv_from_zip():
     except Exception as e:
         print(f"发生未知错误: {e}")
 
+def run():
+    return stage_cache.run_stage('select', process_tsv_from_zip,
+                                 inputs=[__file__, zip_file_path], outputs=[output_file],
+                                 config={'ai_prefixes': ai_prefixes, 'chunk': CHUNK_SIZE})
+
 if __name__ == "__main__":
-    process_tsv_from_zip()
\ No newline at end of file
+    run()
\ No newline at end of file
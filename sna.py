@@ -0,0 +1,216 @@
+"""
+专利睡美人分析流水线的统一入口
+
+    python sna.py <子命令> [参数] [+ <子命令> [参数] ...]
+
+例:
+    python sna.py citers --target 5210799 + expand --target 5210799 --top-n 10 + org --network 5210799 --targets 5210799
+    python sna.py cpc --awakers 4901362,5210799 --no-plot
+
+各子命令只在运行时才导入对应脚本（及 pandas / plotly / networkx 等重型库），
+用 “+” 串联的多个子命令在同一进程内执行，共享 patent_index 中已打开的索引句柄；
+每个子命令运行前都会把模块配置恢复为导入时的默认值，前一个子命令的参数不会带入下一个。
+指定 --target / --network 时，未显式给出的输入输出文件名按目标专利号推导，
+不同目标的任务（包括并行运行的任务）不会互相覆盖结果文件。
+"""
+import argparse
+import importlib
+import sys
+
+
+def _ids(value):
+    return [v.strip() for v in value.split(',') if v.strip()]
+
+
+# 子命令 -> (模块名, 入口函数, 说明, [(参数, 模块内配置变量, argparse 选项)])
+# 配置变量为 None 的参数只用于推导文件名，不写入模块
+_NETWORK = ('--network', None, {'help': '扩散网络的目标专利号，读取 expand --target 对应的输出文件'})
+SUBCOMMANDS = {
+    'select': ('select_patents', 'run', '按 IPC 前缀筛选 AI 专利', [
+        ('--input', 'zip_file_path', {}),
+        ('--output', 'output_file', {}),
+        ('--prefixes', 'ai_prefixes', {'type': lambda v: tuple(_ids(v)), 'help': '逗号分隔的 IPC 前缀'}),
+        ('--chunk-size', 'CHUNK_SIZE', {'type': int}),
+    ]),
+    'match': ('match', 'run', '提取引用了 AI 专利的引证关系', [
+        ('--ids', 'ai_id_file', {}),
+        ('--citations', 'citation_zip_path', {}),
+        ('--output', 'output_file', {}),
+        ('--chunk-size', 'CHUNK_SIZE', {'type': int}),
+    ]),
+    'summary': ('summary', 'run', '汇总逐年引证历史', [
+        ('--links', 'links_file', {}),
+        ('--patents', 'patent_info_zip', {}),
+        ('--output', 'output_file', {}),
+        ('--chunk-size', 'CHUNK_SIZE', {'type': int}),
+    ]),
+    'detect': ('Typical_Sleepy', 'run', '突发检测与 B 指数计算', [
+        ('--input', 'INPUT_FILE', {}),
+        ('--output', 'OUTPUT_FILE', {}),
+    ]),
+    'significance': ('null_model', 'main', '睡美人得分的零模型显著性检验', [
+        ('--input', 'INPUT_FILE', {}),
+        ('--output', 'OUTPUT_FILE', {}),
+        ('--samples', 'N_SAMPLES', {'type': int}),
+        ('--seed', 'SEED', {'type': int}),
+        ('--workers', 'WORKERS', {'type': int}),
+    ]),
+    'timeline': ('temporal_index', 'main', '按年追踪目标专利扩散网络的增长', [
+        ('--target', 'TARGET_ID', {}),
+        ('--max-layer', 'MAX_LAYER', {'type': int}),
+        ('--start', 'START_YEAR', {'type': int, 'help': '从该年开始输出逐年指标（网络仍从目标出生年份开始累计）'}),
+        ('--end', 'END_YEAR', {'type': int}),
+        ('--output', 'OUTPUT_TIMELINE', {}),
+        ('--edges', 'OUTPUT_EDGES', {}),
+    ]),
+    'citers': ('ana4901362', 'run', '目标专利的施引者画像（年份/申请人/CPC）', [
+        ('--target', 'TARGET_PATENT', {}),
+        ('--output', 'OUTPUT_FILE', {}),
+        ('--chunk-size', 'CHUNK_SIZE', {'type': int}),
+    ]),
+    'expand': ('2hop', 'run', '以巨人施引者为源构建三层扩散网络', [
+        ('--target', 'TARGET_ID', {}),
+        ('--input', 'INPUT_CSV', {}),
+        ('--top-n', 'TOP_N_GIANTS', {'type': int}),
+        ('--edges', 'OUTPUT_EDGES', {}),
+        ('--nodes', 'OUTPUT_NODES', {}),
+        ('--chunk-size', 'CHUNK_SIZE', {'type': int}),
+        ('--giant-mode', 'GIANT_MODE', {'choices': ['exact', 'approx']}),
+    ]),
+    'topk': ('heavy_hitters', 'main', '有界内存流式统计被引最多的 Top-N 专利', [
+        ('--domain', 'DOMAIN_FILE', {'help': '领域专利清单 CSV，传空字符串表示全库'}),
+        ('--top-n', 'TOP_N', {'type': int}),
+        ('--per-year', 'PER_YEAR', {'action': 'store_true', 'default': None}),
+        ('--capacity', 'CAPACITY', {'type': int}),
+        ('--workers', 'WORKERS', {'type': int}),
+        ('--output', 'OUTPUT_FILE', {}),
+        ('--chunk-size', 'CHUNK_SIZE', {'type': int}),
+    ]),
+    'org': ('org_network', 'main', '折叠为组织级扩散网络', [
+        _NETWORK,
+        ('--edges', 'EDGE_FILE', {}),
+        ('--targets', 'TARGET_IDS', {'type': _ids}),
+        ('--output', 'OUTPUT_ORG_EDGES', {}),
+        ('--output-yearly', 'OUTPUT_ORG_YEARLY', {}),
+        ('--output-awakeners', 'OUTPUT_AWAKENERS', {}),
+    ]),
+    'cpc': ('migrate', 'plot_focused_cpc_pathway', 'Awaker 的 CPC 技术迁移路径', [
+        _NETWORK,
+        ('--edges', 'EDGE_FILE', {}),
+        ('--awakers', 'AWAKER_IDS', {'type': _ids}),
+        ('--html', 'OUTPUT_HTML', {}),
+        ('--report', 'OUTPUT_TXT', {}),
+        ('--no-plot', 'PLOT', {'action': 'store_false', 'default': None}),
+        ('--no-show', 'SHOW', {'action': 'store_false', 'default': None}),
+    ]),
+    'viz': ('web_visualization', 'plot_stunning_network', '交互式多级扩散网络图', [
+        _NETWORK,
+        ('--nodes', 'NODE_FILE', {}),
+        ('--edges', 'EDGE_FILE', {}),
+        ('--html', 'OUTPUT_HTML', {}),
+        ('--no-show', 'SHOW', {'action': 'store_false', 'default': None}),
+    ]),
+    'render': ('render_beauties', 'render_all', '并行批量绘制全部睡美人的引证曲线', [
+        ('--input', 'INPUT_FILE', {}),
+        ('--output-dir', 'OUTPUT_DIR', {}),
+        ('--pdf', 'OUTPUT_PDF', {}),
+        ('--grid', 'GRID', {'type': lambda v: tuple(int(x) for x in v.lower().split('x')), 'help': '每页 行x列，如 4x4'}),
+        ('--dpi', 'DPI', {'type': int}),
+        ('--workers', 'WORKERS', {'type': int}),
+    ]),
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='sna.py', description='专利睡美人分析流水线')
+    parser.add_argument('--no-cache', action='store_true', help='不使用阶段缓存，强制重新计算')
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name, (_, _, help_text, options) in SUBCOMMANDS.items():
+        p = sub.add_parser(name, help=help_text)
+        for flag, attr, kwargs in options:
+            p.add_argument(flag, dest=attr or flag.lstrip('-').replace('-', '_'), **kwargs)
+    return parser
+
+
+# 子命令 -> {配置变量: 文件名模板}，{} 处填入目标专利号
+PER_TARGET_FILES = {
+    'citers': {'OUTPUT_FILE': 'citation_analysis_{}_final.csv'},
+    'expand': {'INPUT_CSV': 'citation_analysis_{}_final.csv',
+               'OUTPUT_EDGES': 'expanded_diffusion_edges_{}.csv',
+               'OUTPUT_NODES': 'expanded_diffusion_nodes_{}.csv'},
+    'timeline': {'OUTPUT_TIMELINE': 'diffusion_timeline_{}.csv',
+                 'OUTPUT_EDGES': 'diffusion_temporal_edges_{}.csv'},
+    'org': {'EDGE_FILE': 'expanded_diffusion_edges_{}.csv',
+            'OUTPUT_ORG_EDGES': 'org_diffusion_edges_{}.csv',
+            'OUTPUT_ORG_YEARLY': 'org_diffusion_edges_by_year_{}.csv',
+            'OUTPUT_AWAKENERS': 'org_awakeners_{}.csv'},
+    'cpc': {'EDGE_FILE': 'expanded_diffusion_edges_{}.csv',
+            'OUTPUT_HTML': 'cpc_real_transition_{}.html',
+            'OUTPUT_TXT': 'cpc_analysis_report_{}.txt'},
+    'viz': {'NODE_FILE': 'expanded_diffusion_nodes_{}.csv',
+            'EDGE_FILE': 'expanded_diffusion_edges_{}.csv',
+            'OUTPUT_HTML': 'patent_network_interactive_{}.html'},
+}
+
+# 模块名 -> {配置变量: 导入时的默认值}
+_DEFAULTS = {}
+
+
+def _derive_defaults(name, args):
+    """按目标专利号推导默认文件名，避免逐个目标手工指定"""
+    target = (getattr(args, 'TARGET_PATENT', None) or getattr(args, 'TARGET_ID', None)
+              or getattr(args, 'network', None))
+    if target is None:
+        return
+    for attr, template in PER_TARGET_FILES.get(name, {}).items():
+        if getattr(args, attr) is None:
+            setattr(args, attr, template.format(target))
+
+
+def run_command(args):
+    module_name, entry, _, options = SUBCOMMANDS[args.command]
+    _derive_defaults(args.command, args)
+    module = importlib.import_module(module_name)
+    # 首次运行前记录默认配置，之后每次运行前先恢复，串联的子命令互不影响
+    defaults = _DEFAULTS.setdefault(module_name, {attr: getattr(module, attr) for _, attr, _ in options if attr})
+    for attr, value in defaults.items():
+        setattr(module, attr, value)
+    for _, attr, _ in options:
+        value = getattr(args, attr) if attr else None
+        if value is not None:
+            setattr(module, attr, value)
+    return getattr(module, entry)()
+
+
+def split_chain(argv):
+    """按独立的 “+” 拆分串联的子命令"""
+    chain, current = [], []
+    for token in argv:
+        if token == '+':
+            chain.append(current)
+            current = []
+        else:
+            current.append(token)
+    chain.append(current)
+    return [c for c in chain if c]
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = build_parser()
+    chain = split_chain(argv)
+    if not chain:
+        parser.print_help()
+        return 1
+    # 先解析全部子命令，参数有误时不执行任何阶段
+    parsed = [parser.parse_args(tokens) for tokens in chain]
+    if any(args.no_cache for args in parsed):
+        import stage_cache
+        stage_cache.ENABLED = False
+    for args in parsed:
+        run_command(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
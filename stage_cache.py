@@ -0,0 +1,175 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+# ================= 配置区 =================
+CACHE_DIR = '.stage_cache'
+MAX_CACHE_BYTES = 2 * 1024 ** 3   # 缓存总大小上限，超出后按最久未使用淘汰
+HASH_BLOCK = 8 * 1024 ** 2
+ENABLED = True
+# ==========================================
+
+# 缓存目录结构：
+#   file_hashes.json          文件路径 -> (大小, 修改时间, sha256)，避免重复哈希大压缩包
+#   <key>/meta.json           阶段名、输出文件及其哈希、最近使用时间
+#   <key>/<输出文件名>.gz      gzip 压缩后的输出内容
+# key = sha256(阶段名 + 各输入文件内容哈希 + 配置参数)，上游内容不变则 key 不变
+
+
+def _load_json(path, default):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def atomic_write(path, write):
+    """先写入同目录下本进程独有的临时文件，再原子替换，避免并发进程互相覆盖半成品"""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _save_json(path, data):
+    raw = json.dumps(data, ensure_ascii=False, indent=1).encode('utf-8')
+    atomic_write(path, lambda f: f.write(raw))
+
+
+def file_hash(path):
+    """文件内容的 sha256；按 (大小, mtime) 记忆，未改动的大文件不会重复读取"""
+    if not os.path.exists(path):
+        return 'missing'
+    st = os.stat(path)
+    memo_path = os.path.join(CACHE_DIR, 'file_hashes.json')
+    memo = _load_json(memo_path, {})
+    key = os.path.abspath(path)
+    entry = memo.get(key)
+    if entry and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+        return entry['sha256']
+
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            h.update(block)
+    entry = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': h.hexdigest()}
+    # 记忆表只是加速手段：写入前重新读取以合并其他进程的结果，
+    # 并发时偶尔丢失一条记录只会导致下次重新哈希，不影响正确性
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    memo = _load_json(memo_path, {})
+    memo[key] = entry
+    try:
+        _save_json(memo_path, memo)
+    except OSError:
+        pass
+    return entry['sha256']
+
+
+def stage_key(name, inputs, config=None):
+    payload = {
+        'stage': name,
+        'inputs': {os.path.basename(p): file_hash(p) for p in inputs},
+        'config': config or {},
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+
+def _restore(key, outputs):
+    entry_dir = os.path.join(CACHE_DIR, key)
+    meta = _load_json(os.path.join(entry_dir, 'meta.json'), None)
+    if meta is None:
+        return False
+    stored = meta['outputs']
+    if any(os.path.basename(p) not in stored for p in outputs):
+        return False
+    for p in outputs:
+        info = stored[os.path.basename(p)]
+        # 工作目录中的文件已与缓存一致时不必解压
+        if file_hash(p) == info['sha256']:
+            continue
+        with gzip.open(os.path.join(entry_dir, info['blob']), 'rb') as src:
+            atomic_write(p, lambda dst: shutil.copyfileobj(src, dst))
+    meta['last_used'] = time.time()
+    try:
+        _save_json(os.path.join(entry_dir, 'meta.json'), meta)
+    except OSError:
+        pass
+    return True
+
+
+def _gzip_copy(src, f):
+    with gzip.GzipFile(fileobj=f, mode='wb', compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst)
+
+
+def _store(key, name, outputs):
+    entry_dir = os.path.join(CACHE_DIR, key)
+    os.makedirs(entry_dir, exist_ok=True)
+    stored = {}
+    for p in outputs:
+        blob = os.path.basename(p) + '.gz'
+        with open(p, 'rb') as src:
+            atomic_write(os.path.join(entry_dir, blob),
+                          lambda f: _gzip_copy(src, f))
+        stored[os.path.basename(p)] = {'blob': blob, 'sha256': file_hash(p),
+                                       'bytes': os.path.getsize(os.path.join(entry_dir, blob))}
+    _save_json(os.path.join(entry_dir, 'meta.json'),
+               {'stage': name, 'outputs': stored, 'last_used': time.time()})
+    evict()
+
+
+def evict(max_bytes=None):
+    """按最近使用时间淘汰，直到缓存总大小不超过上限"""
+    max_bytes = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+    if not os.path.isdir(CACHE_DIR):
+        return
+    entries = []
+    for key in os.listdir(CACHE_DIR):
+        meta = _load_json(os.path.join(CACHE_DIR, key, 'meta.json'), None)
+        if meta is not None:
+            size = sum(o['bytes'] for o in meta['outputs'].values())
+            entries.append((meta['last_used'], size, key))
+    total = sum(size for _, size, _ in entries)
+    for _, size, key in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(os.path.join(CACHE_DIR, key), ignore_errors=True)
+        total -= size
+        print(f"[stage_cache] 淘汰缓存 {key}")
+
+
+def run_stage(name, func, inputs, outputs, config=None):
+    """
+    以内容寻址方式运行一个流水线阶段
+    inputs 与 config 都未变化时直接从缓存还原 outputs，跳过 func
+    """
+    if not ENABLED:
+        return func()
+    key = stage_key(name, inputs, config)
+    try:
+        hit = _restore(key, outputs)
+    except OSError:
+        # 缓存条目恰好被其他进程淘汰，按未命中处理
+        hit = False
+    if hit:
+        print(f"[stage_cache] {name} 命中缓存 ({key[:8]})，跳过计算，已还原: {', '.join(outputs)}")
+        return None
+
+    started = time.time()
+    result = func()
+    # 只缓存本次运行确实重新写出的完整输出（脚本内部吞掉异常时不会误存旧文件）
+    if all(os.path.exists(p) and os.path.getmtime(p) >= started - 1 for p in outputs):
+        _store(key, name, outputs)
+        print(f"[stage_cache] {name} 结果已缓存 ({key[:8]})")
+    return result
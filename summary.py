@@ -1,11 +1,13 @@
 import pandas as pd
 import zipfile
 import os
+import stage_cache
 
 # ================= 配置区 =================
 links_file = 'ai_patent_citation_links.csv'     
 patent_info_zip = 'g_patent.tsv.zip'           
 output_file = 'ai_patent_summary.csv'
+CHUNK_SIZE = 1000000
 # ==========================================
 
 def analyze_sleeping_beauty_robust():
@@ -17,7 +19,7 @@ def analyze_sleeping_beauty_robust():
         target_tsv = [f for f in z.namelist() if f.endswith('.tsv')][0]
         with z.open(target_tsv) as f:
             # 增加 chunksize 以减少循环次数，增加稳定性
-            reader = pd.read_csv(f, sep='\t', chunksize=1000000, 
+            reader = pd.read_csv(f, sep='\t', chunksize=CHUNK_SIZE, 
                                  usecols=['patent_id', 'patent_date'], 
                                  dtype={'patent_id': str})
             for chunk in reader:
@@ -73,5 +75,10 @@ def analyze_sleeping_beauty_robust():
     print("-" * 30)
     print(f"处理成功！结果已保存至: {output_file}")
 
+def run():
+    return stage_cache.run_stage('summary', analyze_sleeping_beauty_robust,
+                                 inputs=[__file__, links_file, patent_info_zip], outputs=[output_file],
+                                 config={'chunk': CHUNK_SIZE})
+
 if __name__ == "__main__":
-    analyze_sleeping_beauty_robust()
\ No newline at end of file
+    run()
\ No newline at end of file
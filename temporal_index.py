@@ -0,0 +1,157 @@
+import os
+import numpy as np
+import pandas as pd
+import patent_index as pi
+
+# ================= 配置区 =================
+TARGET_ID = '4901362'
+MAX_LAYER = 2             # 扩散层数：1 = 直接施引者，2 = 施引者的施引者
+START_YEAR = None         # 逐年指标的输出起止年份，None 表示从目标出生年到数据最后一年
+                          # （网络始终从出生年开始回放，START_YEAR 不影响累计指标）
+END_YEAR = None
+OUTPUT_TIMELINE = 'diffusion_timeline_4901362.csv'
+OUTPUT_EDGES = 'diffusion_temporal_edges_4901362.csv'
+# ==========================================
+
+# 时序索引（与 patent_index 共用 INDEX_DIR）：
+#   temporal_src.npy      施引专利行号，按施引年份排序
+#   temporal_dst.npy      被引专利行号
+#   temporal_years.npy    出现过的施引年份（升序）
+#   temporal_offsets.npy  年份 years[i] 的边位于 [offsets[i], offsets[i+1])
+# 边的时间取施引专利的授权年份（与 summary.py 的 citing_year 口径一致）；
+# PatentsView 的 citation_date 记录的是被引专利的日期，不能代表引用发生的时间。
+
+
+def build_temporal_index():
+    """由引证 CSR 与年份索引生成按年排序的边表，无需再扫描原始引证文件"""
+    vocab, patent_year = pi.load_patent_index()
+    indptr, indices = pi.load_citation_index()
+    print("正在构建按施引年份排序的时序引证索引...")
+    dst = np.repeat(np.arange(len(vocab), dtype=np.int32), np.diff(np.asarray(indptr)))
+    src = np.asarray(indices, dtype=np.int32)
+    years = np.asarray(patent_year)[src]
+
+    known = years > 0
+    src, dst, years = src[known], dst[known], years[known]
+    order = np.argsort(years, kind='stable')
+    src, dst, years = src[order], dst[order], years[order]
+    uniq, starts = np.unique(years, return_index=True)
+    offsets = np.append(starts, len(years)).astype(np.int64)
+
+    pi.save_array('temporal_src.npy', src)
+    pi.save_array('temporal_dst.npy', dst)
+    pi.save_array('temporal_years.npy', uniq.astype(np.int16))
+    pi.save_array('temporal_offsets.npy', offsets)
+    pi.save_sources('temporal', [pi.FILE_PATENT, pi.FILE_CITATION])
+    print(f">>> 时序索引完成：{len(src)} 条边，{uniq.min() if len(uniq) else '-'}–{uniq.max() if len(uniq) else '-'} 年。")
+
+
+class TemporalGraph:
+    """按年切片的引证图；所有视图都是 mmap 数组上的切片，不复制数据"""
+
+    def __init__(self):
+        pi.ensure_index('temporal_offsets.npy', 'temporal', [pi.FILE_PATENT, pi.FILE_CITATION],
+                        build_temporal_index)
+        load = lambda name: np.load(os.path.join(pi.INDEX_DIR, f'temporal_{name}.npy'), mmap_mode='r')
+        self.src, self.dst = load('src'), load('dst')
+        self.years, self.offsets = load('years'), load('offsets')
+        self.vocab, self.patent_year = pi.load_patent_index()
+
+    def _start(self, year):
+        return int(self.offsets[np.searchsorted(self.years, year, side='left')])
+
+    def _end(self, year):
+        return int(self.offsets[np.searchsorted(self.years, year, side='right')])
+
+    def window(self, y1, y2):
+        """施引年份在 [y1, y2] 内的边 (src, dst)"""
+        a, b = self._start(y1), self._end(y2)
+        return self.src[a:b], self.dst[a:b]
+
+    def as_of(self, year):
+        """截至 year（含）的全部边，即 “year 年时的引证网络”"""
+        b = self._end(year)
+        return self.src[:b], self.dst[:b]
+
+    def year_edges(self, year):
+        return self.window(year, year)
+
+    def diffusion_by_year(self, target, max_layer=MAX_LAYER, start=None, end=None):
+        """
+        逐年增量追踪 target 的扩散网络
+        某专利在首次引用网络内（层数 < max_layer）节点的那一年加入网络，层数 = 被引节点层数 + 1；
+        每年只处理当年的边切片，同年内按层逐级扩展。
+        网络总是从 target 的出生年份开始回放，start 只决定从哪一年开始输出逐年指标，
+        因此累计指标与 start 无关。
+        返回 (逐年指标表, 节点加入年份数组, 节点层数数组)
+        """
+        root = int(pi.encode_patents([target], self.vocab)[0])
+        if root < 0:
+            raise ValueError(f"未知专利号: {target}")
+        n = len(self.vocab)
+        layer = np.full(n, -1, dtype=np.int8)
+        joined = np.zeros(n, dtype=np.int16)
+        layer[root], joined[root] = 0, self.patent_year[root]
+
+        cpc_indptr, cpc_indices, cpc_names = pi.load_cpc_index()
+        seen_cpc = np.zeros(len(cpc_names), dtype=bool)
+        _, root_cpc = pi.csr_expand(cpc_indptr, cpc_indices, [root])
+        seen_cpc[root_cpc] = True
+
+        birth = int(self.patent_year[root])
+        start = birth if start is None else start
+        end = int(self.years[-1]) if end is None else end
+        rows, total = [], 1
+        for year in range(birth, end + 1):
+            src, dst = self.year_edges(year)
+            src, dst = np.asarray(src), np.asarray(dst)
+            per_layer = []
+            for depth in range(max_layer):
+                hit = (layer[dst] == depth) & (layer[src] < 0)
+                new = np.unique(src[hit])
+                layer[new], joined[new] = depth + 1, year
+                per_layer.append(new)
+
+            new_nodes = np.concatenate(per_layer)
+            total += len(new_nodes)
+            _, cpcs = pi.csr_expand(cpc_indptr, cpc_indices, new_nodes)
+            fresh = np.unique(cpcs[~seen_cpc[cpcs]])
+            seen_cpc[fresh] = True
+            if year < start:
+                continue
+            in_net = (layer[src] >= 0) & (layer[dst] >= 0)
+
+            row = {'Year': year, 'New_Nodes': len(new_nodes), 'Cumulative_Nodes': total,
+                   'New_Edges': int(in_net.sum()), 'New_CPC_Fields': "; ".join(cpc_names[c] for c in fresh),
+                   'Cumulative_CPC_Fields': int(seen_cpc.sum())}
+            for depth, new in enumerate(per_layer, start=1):
+                row[f'New_L{depth}'] = len(new)
+            rows.append(row)
+        return pd.DataFrame(rows), joined, layer
+
+    def network_edges(self, layer, end=None):
+        """扩散网络内的全部边（两端都在网络中），附带施引年份与施引端层数"""
+        src, dst = self.as_of(int(self.years[-1]) if end is None else end)
+        src, dst = np.asarray(src), np.asarray(dst)
+        keep = (layer[src] >= 0) & (layer[dst] >= 0)
+        src, dst = src[keep], dst[keep]
+        return pd.DataFrame({'Source': pi.decode_patents(src, self.vocab),
+                             'Target': pi.decode_patents(dst, self.vocab),
+                             'Year': np.asarray(self.patent_year)[src],
+                             'Layer': layer[src]})
+
+
+def main():
+    graph = TemporalGraph()
+    print(f"正在逐年追踪 {TARGET_ID} 的扩散网络（{MAX_LAYER} 层）...")
+    timeline, joined, layer = graph.diffusion_by_year(TARGET_ID, MAX_LAYER, START_YEAR, END_YEAR)
+    timeline.to_csv(OUTPUT_TIMELINE, index=False)
+    graph.network_edges(layer, END_YEAR).to_csv(OUTPUT_EDGES, index=False)
+
+    print("-" * 30)
+    print(f"逐年扩散指标: {OUTPUT_TIMELINE}")
+    print(f"带年份的扩散网络边表: {OUTPUT_EDGES}（可按 Year 过滤得到任意年份的网络快照）")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,17 @@
 import pandas as pd
-import networkx as nx
-import plotly.graph_objects as go
-import numpy as np
 
 # ================= 配置区 =================
 NODE_FILE = 'expanded_diffusion_nodes.csv'
 EDGE_FILE = 'expanded_diffusion_edges.csv'
 OUTPUT_HTML = 'patent_network_interactive.html'
+SHOW = True   # 批量任务中设为 False，避免弹出浏览器
 # ==========================================
 
 def plot_stunning_network():
+    # 绘图库较重，只在真正绘图时导入
+    import networkx as nx
+    import plotly.graph_objects as go
+
     # 1. 加载数据
     print("正在读取数据...")
     nodes_df = pd.read_csv(NODE_FILE)
@@ -123,7 +125,8 @@ def plot_stunning_network():
     print(f"\n>>> 可视化成功！")
     print(f">>> 文件已保存至: {OUTPUT_HTML}")
     print(f">>> 建议使用 Chrome 浏览器打开，效果最佳。")
-    fig.show()
+    if SHOW:
+        fig.show()
 
 if __name__ == "__main__":
     plot_stunning_network()
\ No newline at end of file